@@ -0,0 +1,45 @@
+"""Micro-benchmark for utils.extract over saved HTML fixtures.
+
+Reports calls/s and MB/s for each fixture, extractor and scan mode so
+extractor throughput can be tracked between changes.
+
+Usage: python benchmarks/bench_extract.py [-n NUMBER]
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.extract import REGISTRY, extract_first, extract_m3u8  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+def bench(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--number", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'fixture':<24}{'case':<22}{'calls/s':>12}{'MB/s':>10}  result")
+    for path in sorted(FIXTURES.glob("*.html")):
+        html = path.read_text(encoding="utf-8")
+        size_mb = len(html.encode()) / 1e6
+        cases = {f"{fn.__name__}": (lambda fn=fn: list(fn(html))) for fn in REGISTRY["generic"]}
+        cases["extract_first"] = lambda: extract_first(html)
+        cases["extract_m3u8"] = lambda: extract_m3u8(html)
+        for name, fn in cases.items():
+            per_call = bench(fn, args.number)
+            found = fn()
+            hit = "hit" if found else "-"
+            print(f"{path.name:<24}{name:<22}{1 / per_call:>12,.0f}{size_mb / per_call:>10,.1f}  {hit}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
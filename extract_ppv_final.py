@@ -1,10 +1,11 @@
-import re
 import time
 import sys
 from pathlib import Path
 
 from playwright.sync_api import sync_playwright
 
+from utils import BrowserSession, M3U8Capture, PlaylistWriter, find_m3u8_in_html
+
 
 INPUT = Path("ppv.m3u")
 OUTPUT = Path("ppv-final.m3u")
@@ -27,62 +28,31 @@ def parse_m3u(path: Path):
     return entries
 
 
-def find_m3u8_in_html(html: str):
-    # naive regex to find .m3u8 urls
-    m = re.findall(r'https?://[^\"\'\s>]+\.m3u8[^\"\'\s>]*', html)
-    return list(dict.fromkeys(m))
-
-
-def extract_from_embed(play, url: str, timeout: int = 20000):
+def extract_from_embed(session: BrowserSession, url: str, timeout: int = 20000):
     found = []
-    browser = None
-    context = None
+    started = time.monotonic()
     try:
-        browser = play.chromium.launch(headless=True)
-        context = browser.new_context()
-        page = context.new_page()
-
-        def on_request(req):
-            u = req.url
-            if ".m3u8" in u:
-                if u not in found:
-                    found.append(u)
-
-        page.on("request", on_request)
-
-        try:
-            page.goto(url, timeout=timeout, wait_until="networkidle")
-        except Exception:
+        with session.page() as page, M3U8Capture(page) as capture:
             try:
-                page.goto(url, timeout=timeout)
+                page.goto(url, timeout=timeout, wait_until="commit")
             except Exception as e:
                 print(f"goto failed for {url}: {e}")
 
-        # allow extra network activity
-        time.sleep(2)
+            # returns on the first playlist request; `timeout` bounds the whole visit
+            capture.wait_sync(timeout / 1000 - (time.monotonic() - started))
+            found.extend(capture.urls)
 
-        # try to inspect HTML for m3u8
-        try:
-            html = page.content()
-            for u in find_m3u8_in_html(html):
-                if u not in found:
-                    found.append(u)
-        except Exception:
-            pass
+            if not found:
+                try:
+                    html = page.content()
+                    for u in find_m3u8_in_html(html):
+                        if u not in found:
+                            found.append(u)
+                except Exception:
+                    pass
 
     except Exception as e:
         print(f"Playwright error for {url}: {e}")
-    finally:
-        try:
-            if context:
-                context.close()
-        except Exception:
-            pass
-        try:
-            if browser:
-                browser.close()
-        except Exception:
-            pass
     return found
 
 
@@ -94,47 +64,55 @@ def main():
     entries = parse_m3u(INPUT)
     print(f"Parsed {len(entries)} entries from {INPUT}")
 
-    out_lines = ["#EXTM3U"]
+    session = None
+    done = 0
 
-    try:
-        with sync_playwright() as p:
-            for idx, (info, uri) in enumerate(entries, 1):
-                try:
-                    print(f"[{idx}/{len(entries)}] Processing: {uri}")
-                    if "pooembed.top/embed" in uri or "pooembed.top" in uri or "pooembed" in uri:
-                        found = []
-                        try:
-                            found = extract_from_embed(p, uri)
-                        except Exception as e:
-                            print(f"Error extracting from {uri}: {e}")
-
-                        if found:
-                            chosen = found[0]
-                            print(f"  -> found m3u8: {chosen}")
-                            out_lines.append(info)
-                            out_lines.append(chosen)
+    # entries stream into the writer; session errors are handled inside it,
+    # so whatever was processed is still swapped into place
+    with PlaylistWriter(OUTPUT, keep_empty=False) as playlist:
+        try:
+            with sync_playwright() as p, BrowserSession(p) as session:
+                for idx, (info, uri) in enumerate(entries, 1):
+                    try:
+                        print(f"[{idx}/{len(entries)}] Processing: {uri}")
+                        if "pooembed.top/embed" in uri or "pooembed.top" in uri or "pooembed" in uri:
+                            found = []
+                            try:
+                                found = extract_from_embed(session, uri)
+                            except Exception as e:
+                                print(f"Error extracting from {uri}: {e}")
+
+                            if found:
+                                chosen = found[0]
+                                print(f"  -> found m3u8: {chosen}")
+                                playlist.write(info, chosen)
+                            else:
+                                print(f"  -> no m3u8 found, keeping embed URL as fallback")
+                                playlist.write(info, uri)
                         else:
-                            print(f"  -> no m3u8 found, keeping embed URL as fallback")
-                            out_lines.append(info)
-                            out_lines.append(uri)
-                    else:
-                        # copy as-is
-                        out_lines.append(info)
-                        out_lines.append(uri)
-                except KeyboardInterrupt:
-                    print("Interrupted by user, stopping.")
-                    break
-                except Exception as e:
-                    print(f"Unhandled error for {uri}: {e}")
-                    out_lines.append(info)
-                    out_lines.append(uri)
-    except KeyboardInterrupt:
-        print("Interrupted during Playwright session. Writing partial output.")
-    except Exception as e:
-        print(f"Playwright session error: {e}")
-
-    OUTPUT.write_text("\n".join(out_lines), encoding="utf-8")
-    print(f"Wrote {OUTPUT}")
+                            # copy as-is
+                            playlist.write(info, uri)
+                    except KeyboardInterrupt:
+                        print("Interrupted by user, stopping.")
+                        break
+                    except Exception as e:
+                        print(f"Unhandled error for {uri}: {e}")
+                        playlist.write(info, uri)
+                    done = idx
+        except KeyboardInterrupt:
+            print("Interrupted during Playwright session. Writing partial output.")
+        except Exception as e:
+            # the browser is gone; keep the rest as embed URLs, as for a failed extraction
+            print(f"Playwright session error: {e}")
+            for info, uri in entries[done:]:
+                playlist.write(info, uri)
+
+    if playlist.count:
+        print(f"Wrote {OUTPUT} with {playlist.count} of {len(entries)} entries")
+    else:
+        print(f"Nothing processed; kept the existing {OUTPUT}")
+    if session:
+        print(session.summary())
     return 0
 
 
@@ -1,67 +1,41 @@
-import json
 import time
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
-import re
 
 from playwright.sync_api import sync_playwright
 
+from utils import BrowserSession, EventIndex, M3U8Capture, PlaylistWriter, find_m3u8_in_html
+
 
 INPUT_JSON = Path("ppv-api.json")
 OUTPUT_M3U = Path("ppv.m3u")
 
 
-def find_m3u8_in_html(html: str):
-    return list(dict.fromkeys(re.findall(r'https?://[^\"\'\s>]+\.m3u8[^\"\'\s>]*', html)))
-
-
-def extract_from_embed(play, url: str, timeout: int = 20000):
+def extract_from_embed(session: BrowserSession, url: str, timeout: int = 20000):
     found = []
-    browser = None
-    context = None
+    started = time.monotonic()
     try:
-        browser = play.chromium.launch(headless=True)
-        context = browser.new_context()
-        page = context.new_page()
-
-        def on_request(req):
-            u = req.url
-            if ".m3u8" in u and u not in found:
-                found.append(u)
-
-        page.on("request", on_request)
-
-        try:
-            page.goto(url, timeout=timeout, wait_until="networkidle")
-        except Exception:
+        with session.page() as page, M3U8Capture(page) as capture:
             try:
-                page.goto(url, timeout=timeout)
+                page.goto(url, timeout=timeout, wait_until="commit")
             except Exception as e:
                 print(f"goto failed for {url}: {e}")
 
-        time.sleep(1.5)
+            # returns on the first playlist request; `timeout` bounds the whole visit
+            capture.wait_sync(timeout / 1000 - (time.monotonic() - started))
+            found.extend(capture.urls)
 
-        try:
-            html = page.content()
-            for u in find_m3u8_in_html(html):
-                if u not in found:
-                    found.append(u)
-        except Exception:
-            pass
+            if not found:
+                try:
+                    html = page.content()
+                    for u in find_m3u8_in_html(html):
+                        if u not in found:
+                            found.append(u)
+                except Exception:
+                    pass
 
     except Exception as e:
         print(f"Playwright error for {url}: {e}")
-    finally:
-        try:
-            if context:
-                context.close()
-        except Exception:
-            pass
-        try:
-            if browser:
-                browser.close()
-        except Exception:
-            pass
     return found
 
 
@@ -70,56 +44,35 @@ def main():
         print("ppv-api.json not found. Fetch the API first.")
         return 1
 
-    data = json.loads(INPUT_JSON.read_text(encoding="utf-8"))
-    streams_root = data.get("streams") or []
-
     # compute today's UTC date window and next day
     now = datetime.now(timezone.utc)
     start_today = datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
     end_next = start_today + timedelta(days=2) - timedelta(seconds=1)
 
-    selected = []
-    for grp in streams_root:
-        for s in grp.get("streams", []):
-            starts = s.get("starts_at")
-            if not isinstance(starts, int):
-                continue
-            dt = datetime.fromtimestamp(starts, tz=timezone.utc)
-            if start_today <= dt <= end_next:
-                selected.append((grp.get("category"), s))
+    index = EventIndex.for_streams(INPUT_JSON, skip_categories=())
+    selected = index.between(start_today.timestamp(), end_next.timestamp())
 
     if not selected:
         print("No streams for today+tomorrow found in ppv-api.json")
         return 0
 
-    out_lines = ["#EXTM3U"]
     print(f"Found {len(selected)} streams for today+tomorrow; extracting with Playwright...")
 
-    with sync_playwright() as p:
+    with (
+        sync_playwright() as p,
+        BrowserSession(p) as session,
+        PlaylistWriter(OUTPUT_M3U) as playlist,
+    ):
         for idx, (category, s) in enumerate(selected, 1):
             name = s.get("name") or s.get("title") or "Untitled"
-            sid = s.get("id")
-            poster = s.get("poster") or ""
             iframe = s.get("iframe") or s.get("url") or ""
-            starts = s.get("starts_at")
-            dt = datetime.fromtimestamp(starts, tz=timezone.utc)
-
-            attrs = []
-            if sid is not None:
-                attrs.append(f'tvg-id="{sid}"')
-            if poster:
-                attrs.append(f'tvg-logo="{poster}"')
-            if category:
-                attrs.append(f'group-title="{category}"')
-
-            attr_str = " ".join(attrs)
-            info = f'#EXTINF:-1 {attr_str},{name} [{dt.date()}]'
+            dt = datetime.fromtimestamp(s.get("starts_at"), tz=timezone.utc)
 
             final_uri = iframe
             if iframe and ("pooembed" in iframe or "embed" in iframe):
                 print(f"[{idx}/{len(selected)}] Visiting embed: {iframe}")
                 try:
-                    found = extract_from_embed(p, iframe)
+                    found = extract_from_embed(session, iframe)
                     if found:
                         final_uri = found[0]
                         print(f"  -> extracted: {final_uri}")
@@ -132,13 +85,16 @@ def main():
                 if iframe and ".m3u8" in iframe and not iframe.startswith("http"):
                     pass
 
-            out_lines.append(info)
-            out_lines.append(final_uri)
-            # brief pause
-            time.sleep(0.5)
+            playlist.add(
+                final_uri,
+                f"{name} [{dt.date()}]",
+                tvg_id=s.get("id"),
+                tvg_logo=s.get("poster"),
+                group_title=category,
+            )
 
-    OUTPUT_M3U.write_text("\n".join(out_lines), encoding="utf-8")
     print(f"Wrote {OUTPUT_M3U} with {len(selected)} entries")
+    print(session.summary())
     return 0
 
 
@@ -0,0 +1,93 @@
+"""Run every scraper in one event loop.
+
+roxie, watchfooty and ppv share one httpx connection pool and one
+Chromium (launched only if a scraper needs it). Each source gets its
+own timeout so a slow one can't hold up the others.
+
+Every source still writes its own playlist. The live entries of the
+sources that finished are then merged into `all.m3u`, one event per
+match with the healthiest stream first (see `utils.merge`).
+
+Usage: python main.py
+"""
+import asyncio
+import logging
+import time
+
+import httpx
+from playwright.async_api import async_playwright
+
+import ppv
+import roxie
+import watchfooty
+from utils import SharedBrowser, merge_sources, write_master
+
+log = logging.getLogger("main")
+
+# Hard stops. Each scraper stops starting new events once its own RUN_BUDGET
+# is spent, well inside these, and leaves the rest for the next run.
+SOURCE_TIMEOUTS = {
+    "roxie": 300,
+    "watchfooty": 900,
+    "ppv": 900,
+}
+
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+
+MASTER_PLAYLIST = "all.m3u"
+
+
+async def run_source(name: str, coro, timeout: float) -> dict[str, dict] | None:
+    # the source's live entries, or None if it failed or timed out
+    started = time.perf_counter()
+    try:
+        live = await asyncio.wait_for(coro, timeout=timeout)
+    except asyncio.TimeoutError:
+        log.error(f"{name}: timed out after {timeout}s")
+        return None
+    except Exception as e:
+        log.error(f"{name}: failed: {e}")
+        return None
+    log.info(f"{name}: done in {time.perf_counter() - started:.1f}s")
+    return live or {}
+
+
+async def main() -> int:
+    started = time.perf_counter()
+    async with (
+        httpx.AsyncClient(limits=HTTP_LIMITS, timeout=10) as client,
+        async_playwright() as p,
+    ):
+        browser = SharedBrowser(p)
+        try:
+            results = await asyncio.gather(
+                run_source("roxie", roxie.scrape(client), SOURCE_TIMEOUTS["roxie"]),
+                run_source(
+                    "watchfooty",
+                    watchfooty.scrape(client, browser=browser),
+                    SOURCE_TIMEOUTS["watchfooty"],
+                ),
+                run_source("ppv", ppv.scrape(client, browser=browser), SOURCE_TIMEOUTS["ppv"]),
+            )
+        finally:
+            await browser.close()
+    finished = sum(r is not None for r in results)
+    log.info(f"{finished}/{len(results)} source(s) finished in {time.perf_counter() - started:.1f}s")
+    log.info(browser.summary())
+
+    modules = (roxie, watchfooty, ppv)
+    groups = merge_sources(
+        {
+            module.TAG: (live, module.PROBER.results)
+            for module, live in zip(modules, results)
+            if live is not None
+        }
+    )
+    if finished:
+        count = write_master(MASTER_PLAYLIST, groups)
+        log.info(f"Merged {count} stream(s) into {len(groups)} event(s) in {MASTER_PLAYLIST}")
+    return 0 if finished else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -1,45 +1,28 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
 from functools import partial
 
 import httpx
-from playwright.async_api import async_playwright
 import logging
-import json
 
-# --- Standalone utility classes (from roxie.py/watchfooty.py) ---
-import json
-import os
-class Cache:
-    def __init__(self, filename, exp=None):
-        self.filename = filename
-        self.exp = exp
-    def load(self, *a, **k):
-        if not os.path.exists(self.filename):
-            return {}
-        try:
-            with open(self.filename, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    def write(self, data):
-        with open(self.filename, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-class Time:
-    @staticmethod
-    def now():
-        import datetime
-        return datetime.datetime.now()
-    @staticmethod
-    def clean(dt):
-        return dt
-    @staticmethod
-    def from_ts(ts):
-        import datetime
-        return datetime.datetime.fromtimestamp(ts)
-    def delta(self, **kwargs):
-        import datetime
-        return self + datetime.timedelta(**kwargs)
-    def timestamp(self):
-        return self.timestamp()
+from utils import (
+    DEFERRED,
+    Cache,
+    CachedAPI,
+    HLSProber,
+    Lifecycle,
+    M3U8Capture,
+    MirrorHealth,
+    PlaylistWriter,
+    RouteFilter,
+    Scheduler,
+    Time,
+    URLPredictor,
+    browser_context,
+    fastest_mirror,
+)
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 def get_logger(name):
     return logging.getLogger(name)
@@ -51,18 +34,12 @@ leagues = Leagues()
 # --- Real network/process_event implementation ---
 class Network:
     @staticmethod
-    async def get_base(mirrors):
-        # Try each mirror, return the first that works
-        import httpx
-        for url in mirrors:
-            try:
-                async with httpx.AsyncClient() as client:
-                    r = await client.get(url, timeout=5)
-                    if r.status_code == 200:
-                        return url
-            except Exception:
-                continue
-        return mirrors[0]
+    async def get_base(mirrors, client=None, health=None):
+        # Race the mirrors, fastest-known first; None if none of them answer
+        if client is not None:
+            return await fastest_mirror(client, mirrors, health)
+        async with httpx.AsyncClient() as client:
+            return await fastest_mirror(client, mirrors, health)
     @staticmethod
     async def safe_process(handler, url_num, log):
         try:
@@ -71,49 +48,59 @@ class Network:
             log.warning(f"Exception in handler: {e}")
             return None
     @staticmethod
-    async def browser(p, browser=None):
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context()
-        return browser, context
-    @staticmethod
-    async def process_event(url, url_num, context, timeout=6, log=None):
-        page = await context.new_page()
-        captured = []
-        import asyncio
-        got_one = asyncio.Event()
-        def handler(request):
-            u = request.url
-            if ".m3u8" in u:
-                captured.append(u)
-                got_one.set()
-        page.on("request", handler)
-        try:
-            await page.goto(url, wait_until="domcontentloaded", timeout=15_000)
-            await page.wait_for_timeout(1_500)
-            wait_task = asyncio.create_task(got_one.wait())
+    async def process_event(url, url_num, pool, timeout=12, log=None):
+        # `timeout` is the overall deadline: navigation plus waiting for the player
+        async with pool.page() as page:
+            with M3U8Capture(page) as capture:
+                try:
+                    async with asyncio.timeout(timeout):
+                        await capture.wait_during(
+                            page.goto(url, wait_until="commit", timeout=timeout * 1_000)
+                        )
+                except TimeoutError:
+                    if log: log.warning(f"URL {url_num}) Timed out waiting for M3U8.")
+                    return None
+                except Exception as e:
+                    if log: log.warning(f"URL {url_num}) Exception while processing: {e}")
+                    return None
+                if log: log.info(f"URL {url_num}) Captured M3U8")
+                return capture.first
+class PagePool:
+    # Bounded set of reusable pages; at most `size` pages are open and in use at once.
+    def __init__(self, context, size=4):
+        self.context = context
+        self.size = max(1, size)
+        self._sem = asyncio.Semaphore(self.size)
+        self._idle = []
+        self._pages = []
+    @asynccontextmanager
+    async def page(self):
+        async with self._sem:
+            if self._idle:
+                page = self._idle.pop()
+            else:
+                page = await self.context.new_page()
+                self._pages.append(page)
             try:
-                await asyncio.wait_for(wait_task, timeout=timeout)
-            except asyncio.TimeoutError:
-                if log: log.warning(f"URL {url_num}) Timed out waiting for M3U8.")
-                return None
+                yield page
             finally:
-                if not wait_task.done():
-                    wait_task.cancel()
+                # unload the embed first: its player keeps refreshing the old
+                # playlist and would be captured as the next event's stream
+                if not page.is_closed():
                     try:
-                        await wait_task
-                    except asyncio.CancelledError:
-                        pass
-            if captured:
-                if log: log.info(f"URL {url_num}) Captured M3U8")
-                return captured[-1]
-            if log: log.warning(f"URL {url_num}) No M3U8 captured after waiting.")
-            return None
-        except Exception as e:
-            if log: log.warning(f"URL {url_num}) Exception while processing: {e}")
-            return None
-        finally:
-            page.remove_listener("request", handler)
-            await page.close()
+                        await page.goto("about:blank")
+                    except Exception:
+                        await page.close()
+                if page.is_closed():
+                    self._pages.remove(page)
+                else:
+                    self._idle.append(page)
+    async def close(self):
+        for page in self._pages:
+            if not page.is_closed():
+                await page.close()
+        self._pages.clear()
+        self._idle.clear()
 network = Network()
 
 log = get_logger(__name__)
@@ -122,8 +109,22 @@ urls: dict[str, dict[str, str | float]] = {}
 
 TAG = "PPV"
 
+MAX_PAGES = 4
+CAPTURE_TIMEOUT = 12
+WINDOW = 43_200
+# stop starting new pages after this; the rest roll over to the next cron run
+RUN_BUDGET = 600
+
 CACHE_FILE = Cache(f"{TAG.lower()}.json", exp=10_800)
-API_FILE = Cache(f"{TAG.lower()}-api.json", exp=19_800)
+API_FILE = CachedAPI(f"{TAG.lower()}-api.json", exp=19_800)
+
+# a browser UA for playlist checks; the Referer is added per entry
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+}
+MIRROR_HEALTH = MirrorHealth()
+PROBER = HLSProber(headers=HEADERS, cache=Cache(f"{TAG.lower()}-live.json", exp=300))
+LIFECYCLE = Lifecycle()
 
 API_MIRRORS = [
     "https://old.ppv.to/api/streams",
@@ -140,155 +141,140 @@ BASE_MIRRORS = [
 
 async def refresh_api_cache(
     client: httpx.AsyncClient,
-    url: str,
-) -> dict[str, dict[str, str]]:
-    log.info(f"Refreshing API cache from {url}")
-
-    try:
-        r = await client.get(url, timeout=10)
-        r.raise_for_status()
-    except Exception as e:
-        log.error(f'Failed to fetch "{url}": {e}')
-        return {}
-
-    data = r.json()
-    log.info(f"Fetched API data: {len(data) if hasattr(data, '__len__') else 'ok'} items")
-    try:
-        API_FILE.write(data)
-        log.info(f"Wrote API cache to {API_FILE.filename}")
-    except Exception as e:
-        log.warning(f"Failed to write API cache: {e}")
-    return data
-
+    force: bool = False,
+) -> tuple[bool, str | None]:
+    # At most one API transfer per run: none while the cache is fresh,
+    # otherwise a single conditional request raced across the mirrors.
+    ok, url = await API_FILE.get(client, API_MIRRORS, MIRROR_HEALTH, force=force)
+    log.info(f"API cache {API_FILE.filename}: transfer {API_FILE.last_transfer}")
+    return ok, url
 
-async def get_events(
-    client: httpx.AsyncClient,
-    api_url: str,
-    cached_keys: set[str],
-) -> list[dict[str, str]]:
-    api_data = API_FILE.load(per_entry=False)
-    if not api_data:
-        log.info("No API cache found or empty; refreshing now")
-        api_data = await refresh_api_cache(client, api_url)
-    else:
-        log.info(f"Loaded API cache from {API_FILE.filename}")
 
+def get_events(cached_keys: set[str]) -> list[dict[str, str]]:
     events = []
 
-    now = Time.clean(Time.now())
-    start_dt = now.delta(hours=-12)
-    end_dt = now.delta(hours=12)
-    log.info(f"Event time window: {start_dt} to {end_dt}")
+    now = time.time()
+    start_ts, end_ts = now - WINDOW, now + WINDOW
+    log.info(f"Event time window: {Time.from_ts(start_ts)} to {Time.from_ts(end_ts)}")
 
-    for stream_group in api_data.get("streams", []):
-        sport = stream_group["category"]
-        if sport == "24/7 Streams":
+    # the index is built once per payload; this is just two bisections
+    for sport, event in API_FILE.index().between(start_ts, end_ts):
+        name = event.get("name")
+        starts = event.get("starts_at")
+        logo = event.get("poster")
+        iframe = event.get("iframe")
+        if not (name and starts and iframe):
+            log.info(f"Skipping event (missing data): {name}")
             continue
-        for event in stream_group.get("streams", []):
-            name = event.get("name")
-            start_ts = event.get("starts_at")
-            logo = event.get("poster")
-            iframe = event.get("iframe")
-            if not (name and start_ts and iframe):
-                log.info(f"Skipping event (missing data): {name}")
-                continue
-            key = f"[{sport}] {name} ({TAG})"
-            if cached_keys & {key}:
-                log.info(f"Skipping cached event: {key}")
-                continue
-            event_dt = Time.from_ts(start_ts)
-            if not start_dt <= event_dt <= end_dt:
-                log.info(f"Skipping event (out of window): {key} at {event_dt}")
-                continue
-            log.info(f"Adding event: {key} at {event_dt}")
-            events.append(
-                {
-                    "sport": sport,
-                    "event": name,
-                    "link": iframe,
-                    "logo": logo,
-                    "timestamp": event_dt.timestamp(),
-                }
-            )
+        key = f"[{sport}] {name} ({TAG})"
+        if cached_keys & {key}:
+            log.info(f"Skipping cached event: {key}")
+            continue
+        # the index already compared starts_at as epoch seconds; keep it that way
+        ts = float(starts)
+        log.info(f"Adding event: {key} at {Time.from_ts(ts)}")
+        events.append(
+            {
+                "sport": sport,
+                "event": name,
+                "link": iframe,
+                "logo": logo,
+                "timestamp": ts,
+                "ends_at": event.get("ends_at"),
+                "viewers": event.get("viewers"),
+            }
+        )
     return events
 
 
-async def scrape(client: httpx.AsyncClient) -> None:
-    cached_urls = CACHE_FILE.load()
+async def scrape(
+    client: httpx.AsyncClient,
+    workers: int = MAX_PAGES,
+    browser=None,
+    budget: float | None = RUN_BUDGET,
+) -> dict[str, dict]:
+    scheduler = Scheduler(budget, limit=workers)
+    known = CACHE_FILE.load()
+    # expiring or dead entries are dropped here and resolved again below
+    cached_urls, _ = await LIFECYCLE.triage(client, PROBER, known)
     cached_count = len(cached_urls)
     urls.update(cached_urls)
-    log.info(f"Loaded {cached_count} event(s) from cache")
-    base_url = await network.get_base(BASE_MIRRORS)
-    api_url = await network.get_base(API_MIRRORS)
+    log.info(f"Loaded {len(known)} event(s) from cache")
+    log.info(LIFECYCLE.summary())
+    base_url, (api_ok, api_url) = await asyncio.gather(
+        network.get_base(BASE_MIRRORS, client, MIRROR_HEALTH),
+        refresh_api_cache(client),
+    )
     log.info(f"Using base mirror: {base_url}")
-    log.info(f"Using API mirror: {api_url}")
-    if not (base_url and api_url):
+    log.info(f"Using API mirror: {api_url or 'cached copy'}")
+    if not (base_url and api_ok):
         log.warning("No working PPV mirrors")
         CACHE_FILE.write(cached_urls)
-        return
+        return {}
     log.info(f'Scraping from "{base_url}"')
-    log.info(f"Using base mirror: {base_url}")
-    log.info(f"Using API mirror (selected): {api_url}")
-
-    # Force-fetch the first API mirror raw response and save for debugging
-    try:
-        async with httpx.AsyncClient() as client2:
-            resp = await client2.get(API_MIRRORS[0], timeout=10)
-            resp.raise_for_status()
-            try:
-                raw = resp.json()
-            except Exception:
-                raw = resp.text
-            with open("ppv-api.json", "w", encoding="utf-8") as jf:
-                json.dump(raw, jf, ensure_ascii=False, indent=2)
-            log.info(f"Wrote raw API response to ppv-api.json (mirror {API_MIRRORS[0]})")
-            # Use the first mirror as api_url for subsequent processing
-            api_url = API_MIRRORS[0]
-    except Exception as e:
-        log.warning(f"Direct API fetch failed: {e}")
-    events = await get_events(
-        client,
-        api_url,
-        set(cached_urls.keys()),
-    )
+    # live and soon-to-start events first, so a budget cut only drops the far future
+    events = scheduler.order(get_events(set(cached_urls.keys())))
     log.info(f"Processing {len(events)} new URL(s)")
+    results = []
     if events:
-        async with async_playwright() as p:
-            browser, context = await network.browser(p, browser="brave")
-            for i, ev in enumerate(events, start=1):
-                handler = partial(
-                    network.process_event,
-                    url=ev["link"],
-                    url_num=i,
-                    context=context,
-                    timeout=6,
-                    log=log,
-                )
-                url = await network.safe_process(
-                    handler,
-                    url_num=i,
-                    log=log,
-                )
-                if url:
-                    sport, event, logo, ts, link = (
-                        ev["sport"],
-                        ev["event"],
-                        ev["logo"],
-                        ev["timestamp"],
-                        ev["link"],
+        predictor = URLPredictor(HEADERS).learn_cache(known)
+        results = await asyncio.gather(
+            *(predictor.predict(client, ev["event"], ev["link"]) for ev in events)
+        )
+        log.info(
+            f"Predicted {sum(map(bool, results))}/{len(events)} URL(s) "
+            f"from {len(predictor.templates)} learned template(s)"
+        )
+    if pending := [i for i, url in enumerate(results) if not url]:
+        async with browser_context(browser) as context:
+            routes = RouteFilter()
+            await routes.attach(context)
+            pool = PagePool(context, size=workers)
+            log.info(f"Resolving {len(pending)} URL(s) with {pool.size} concurrent page(s)")
+            tasks = [
+                scheduler.run(
+                    partial(
+                        network.safe_process,
+                        partial(
+                            network.process_event,
+                            url=events[i]["link"],
+                            url_num=i + 1,
+                            pool=pool,
+                            timeout=CAPTURE_TIMEOUT,
+                            log=log,
+                        ),
+                        url_num=i + 1,
+                        log=log,
                     )
-                    key = f"[{sport}] {event} ({TAG})"
-                    tvg_id, pic = leagues.get_tvg_info(sport, event)
-                    entry = {
-                        "url": url,
-                        "logo": logo or pic,
-                        "base": base_url,
-                        "timestamp": ts,
-                        "id": tvg_id or "Live.Event.us",
-                        "link": link,
-                    }
-                    urls[key] = cached_urls[key] = entry
-            await browser.close()
+                )
+                for i in pending
+            ]
+            # gather keeps results in event order, so cache writes stay deterministic
+            for i, url in zip(pending, await asyncio.gather(*tasks)):
+                results[i] = None if url is DEFERRED else url
+            await pool.close()
+        log.info(routes.summary())
+        log.info(scheduler.summary())
+    for ev, url in zip(events, results):
+        if url:
+            sport, event, logo, ts, link = (
+                ev["sport"],
+                ev["event"],
+                ev["logo"],
+                ev["timestamp"],
+                ev["link"],
+            )
+            key = f"[{sport}] {event} ({TAG})"
+            tvg_id, pic = leagues.get_tvg_info(sport, event)
+            entry = {
+                "url": url,
+                "logo": logo or pic,
+                "base": base_url,
+                "timestamp": ts,
+                "id": tvg_id or "Live.Event.us",
+                "link": link,
+            }
+            urls[key] = cached_urls[key] = LIFECYCLE.stamp(entry)
     if new_count := len(cached_urls) - cached_count:
         log.info(f"Collected and cached {new_count} new event(s)")
     else:
@@ -296,13 +282,20 @@ async def scrape(client: httpx.AsyncClient) -> None:
     CACHE_FILE.write(cached_urls)
 
     # Export only working links to M3U playlist
-    m3u_lines = ['#EXTM3U']
-    for key, entry in cached_urls.items():
-        url = entry.get("url")
-        if not url:
-            continue
-        m3u_lines.append(f'#EXTINF:-1 tvg-id="{entry.get("id", "")}" tvg-logo="{entry.get("logo", "")}",{key}')
-        m3u_lines.append(url)
-    with open(f"{TAG.lower()}.m3u", "w", encoding="utf-8") as f:
-        f.write("\n".join(m3u_lines))
+    live = await PROBER.filter_live(client, cached_urls)
+    log.info(
+        f"Probed {len(cached_urls)} playlist(s): {len(live)} live, "
+        f"{PROBER.checked} checked, {PROBER.cache_hits} from cache"
+    )
+    with PlaylistWriter(f"{TAG.lower()}.m3u") as playlist:
+        for key, entry in live.items():
+            playlist.add(entry["url"], key, tvg_id=entry.get("id"), tvg_name=key, tvg_logo=entry.get("logo"))
     log.info(f"Exported working events to {TAG.lower()}.m3u")
+    return live
+
+
+if __name__ == "__main__":
+    async def main():
+        async with httpx.AsyncClient() as client:
+            await scrape(client)
+    asyncio.run(main())
@@ -3,20 +3,41 @@
 Single-file pipeline to:
 - fetch PPV API mirrors and save `ppv-api.json`
 - filter streams for today + tomorrow (UTC)
-- visit embed pages with Playwright to capture direct .m3u8 URLs
+- resolve embed pages to direct .m3u8 URLs, trying a plain HTTP fetch
+  first and only falling back to Playwright when that finds nothing
+- validate the resolved playlists; if none of the HTTP tier's URLs
+  serves a playlist, the embed goes back to the browser tier
 - write final `ppv.m3u`
 
+The stages after the fetch run concurrently, connected by bounded queues
+(filter -> resolve -> validate -> write). Each stage has its own worker
+count. A full queue blocks the stage feeding it, so a slow browser tier
+holds back filtering instead of piling work up in memory. Entries are
+written by start time (the order `EventIndex.between` returns them),
+whatever order they finish in.
+
 Usage: python ppv_pipeline.py
 """
-import json
-import time
+import asyncio
+from collections import Counter
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
-import re
-import sys
+from urllib.parse import urlsplit
 
 import httpx
-from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
+
+from utils import (
+    CachedAPI,
+    EventIndex,
+    M3U8Capture,
+    PlaylistWriter,
+    RouteFilter,
+    SharedBrowser,
+    extract_m3u8,
+    find_m3u8_in_html,
+    is_playlist,
+)
 
 
 MIRRORS = [
@@ -28,175 +49,246 @@ MIRRORS = [
 API_FILE = Path("ppv-api.json")
 OUT_M3U = Path("ppv.m3u")
 
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+}
 
-def fetch_api(timeout: int = 10) -> dict | None:
-    for url in MIRRORS:
-        try:
-            print("Trying:", url)
-            r = httpx.get(url, timeout=timeout)
-            print("Status:", r.status_code)
-            if r.status_code != 200:
-                continue
-            try:
-                payload = r.json()
-            except Exception:
-                print("Response not JSON")
-                payload = None
-            if payload is not None:
-                API_FILE.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
-                print(f"Saved API to {API_FILE}")
-                return payload
-        except Exception as e:
-            print("Fetch error:", e)
-    print("Failed to fetch API from mirrors")
-    return None
+QUEUE_SIZE = 16
+RESOLVE_WORKERS = 8
+BROWSER_PAGES = 3
+VALIDATE_WORKERS = 8
+EMBED_TIMEOUT = 20
 
-
-def read_api() -> dict | None:
-    if not API_FILE.exists():
-        return None
-    try:
-        return json.loads(API_FILE.read_text(encoding="utf-8"))
-    except Exception as e:
-        print("Failed to read api file:", e)
-        return None
+DONE = object()
 
 
-def find_m3u8_in_html(html: str):
-    return list(dict.fromkeys(re.findall(r'https?://[^\"\'\s>]+\.m3u8[^\"\'\s>]*', html)))
+async def fetch_api(client: httpx.AsyncClient) -> bool:
+    # same cache file and validators as ppv.py: no transfer while fresh,
+    # otherwise one conditional request raced across the mirrors
+    api = CachedAPI(str(API_FILE), exp=19_800)
+    ok, url = await api.get(client, MIRRORS)
+    print(f"API {API_FILE}: transfer {api.last_transfer}" + (f" from {url}" if url else ""))
+    return ok
 
 
-def extract_from_embed(play, url: str, timeout: int = 20000):
+async def extract_from_embed(
+    browser: SharedBrowser,
+    routes: RouteFilter,
+    url: str,
+    timeout: float = EMBED_TIMEOUT,
+) -> list[str]:
     found = []
-    browser = None
-    context = None
     try:
-        browser = play.chromium.launch(headless=True)
-        context = browser.new_context()
-        page = context.new_page()
-
-        def on_request(req):
-            u = req.url
-            if ".m3u8" in u and u not in found:
-                found.append(u)
-
-        page.on("request", on_request)
-
+        # a fresh context per embed so state from one doesn't leak into the next
+        context = await browser.new_context()
         try:
-            page.goto(url, timeout=timeout, wait_until="networkidle")
-        except Exception:
-            try:
-                page.goto(url, timeout=timeout)
-            except Exception as e:
-                print(f"goto failed for {url}: {e}")
-
-        time.sleep(1.5)
-
-        try:
-            html = page.content()
-            for u in find_m3u8_in_html(html):
-                if u not in found:
-                    found.append(u)
-        except Exception:
-            pass
-
+            await routes.attach(context)
+            page = await context.new_page()
+            with M3U8Capture(page) as capture:
+                try:
+                    # returns on the first playlist request; `timeout` bounds the whole visit
+                    async with asyncio.timeout(timeout):
+                        await capture.wait_during(
+                            page.goto(url, wait_until="commit", timeout=timeout * 1_000)
+                        )
+                except TimeoutError:
+                    pass
+                except Exception as e:
+                    print(f"goto failed for {url}: {e}")
+                found.extend(capture.urls)
+
+                if not found:
+                    try:
+                        found.extend(find_m3u8_in_html(await page.content()))
+                    except Exception:
+                        pass
+        finally:
+            await context.close()
     except Exception as e:
         print(f"Playwright error for {url}: {e}")
-    finally:
-        try:
-            if context:
-                context.close()
-        except Exception:
-            pass
-        try:
-            if browser:
-                browser.close()
-        except Exception:
-            pass
     return found
 
 
-def build_m3u_from_api(data: dict) -> int:
-    streams_root = data.get("streams") or []
+async def extract_from_http(client: httpx.AsyncClient, url: str) -> list[str]:
+    try:
+        r = await client.get(url)
+        r.raise_for_status()
+    except Exception as e:
+        print(f"HTTP fetch failed for {url}: {e}")
+        return []
+    return extract_m3u8(r.text)
+
+
+async def resolve_embed(
+    client: httpx.AsyncClient,
+    browser: SharedBrowser,
+    routes: RouteFilter,
+    pages: asyncio.Semaphore,
+    url: str,
+    skip_http: bool = False,
+) -> tuple[list[str], str | None]:
+    # cheapest tier first; the browser is only launched if a page needs it
+    if not skip_http and (found := await extract_from_http(client, url)):
+        return found, "http"
+    async with pages:
+        if found := await extract_from_embed(browser, routes, url):
+            return found, "browser"
+    return [], None
+
+
+async def first_playlist(client: httpx.AsyncClient, urls: list[str], headers: dict[str, str]) -> str | None:
+    for url in urls:
+        if await is_playlist(client, url, headers):
+            return url
+    return None
 
+
+def select_streams(path: Path = API_FILE) -> list[tuple[str | None, dict]]:
     now = datetime.now(timezone.utc)
     start_today = datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
     end_next = start_today + timedelta(days=2) - timedelta(seconds=1)
 
-    selected = []
-    for grp in streams_root:
-        for s in grp.get("streams", []):
-            starts = s.get("starts_at")
-            if not isinstance(starts, int):
-                continue
-            dt = datetime.fromtimestamp(starts, tz=timezone.utc)
-            if start_today <= dt <= end_next:
-                selected.append((grp.get("category"), s))
-
-    if not selected:
-        print("No streams for today+tomorrow found in API")
-        return 0
+    index = EventIndex.for_streams(path, skip_categories=())
+    return index.between(start_today.timestamp(), end_next.timestamp())
 
-    lines = ["#EXTM3U"]
-    with sync_playwright() as p:
-        for idx, (category, s) in enumerate(selected, 1):
-            name = s.get("name") or s.get("title") or "Untitled"
-            sid = s.get("id")
-            poster = s.get("poster") or ""
-            iframe = s.get("iframe") or s.get("url") or ""
-            starts = s.get("starts_at")
-            dt = datetime.fromtimestamp(starts, tz=timezone.utc)
-
-            attrs = []
-            if sid is not None:
-                attrs.append(f'tvg-id="{sid}"')
-            if poster:
-                attrs.append(f'tvg-logo="{poster}"')
-            if category:
-                attrs.append(f'group-title="{category}"')
-
-            attr_str = " ".join(attrs)
-            info = f'#EXTINF:-1 {attr_str},{name} [{dt.date()}]'
-
-            final_uri = iframe
-            if iframe and ("pooembed" in iframe or "embed" in iframe):
-                print(f"[{idx}/{len(selected)}] Visiting embed: {iframe}")
-                try:
-                    found = extract_from_embed(p, iframe)
-                    if found:
-                        final_uri = found[0]
-                        print(f"  -> extracted: {final_uri}")
-                    else:
-                        print("  -> no m3u8 extracted; keeping iframe")
-                except Exception as e:
-                    print(f"  -> error extracting {iframe}: {e}")
 
-            lines.append(info)
-            lines.append(final_uri)
-            time.sleep(0.5)
+def entry_for(category: str | None, s: dict) -> tuple[str, dict]:
+    name = s.get("name") or s.get("title") or "Untitled"
+    dt = datetime.fromtimestamp(s.get("starts_at"), tz=timezone.utc)
+    attrs = {"tvg_id": s.get("id"), "tvg_logo": s.get("poster"), "group_title": category}
+    return f"{name} [{dt.date()}]", attrs
 
-    OUT_M3U.write_text("\n".join(lines), encoding="utf-8")
-    print(f"Wrote {OUT_M3U} with {len(selected)} entries")
-    return len(selected)
 
+async def run_stage(inbox: asyncio.Queue, outbox: asyncio.Queue, handle, workers: int) -> None:
+    async def worker():
+        while (item := await inbox.get()) is not DONE:
+            await outbox.put(await handle(item))
+        await inbox.put(DONE)  # let sibling workers see the end too
 
-def main():
-    # Step 1: fetch API (if needed)
-    data = None
-    if API_FILE.exists():
-        data = read_api()
-    if not data:
-        data = fetch_api()
-        if data is None:
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    await outbox.put(DONE)
+
+
+async def build_m3u_from_api(
+    client: httpx.AsyncClient,
+    browser: SharedBrowser,
+    path: Path = API_FILE,
+) -> int:
+    to_resolve: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+    to_validate: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+    to_write: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+    routes = RouteFilter()
+    pages = asyncio.Semaphore(BROWSER_PAGES)
+    tiers = Counter()
+    validated = 0
+    total = 0
+
+    async def produce():
+        nonlocal total
+        try:
+            selected = select_streams(path)
+        except Exception as e:
+            print("Failed to read api file:", e)
+            selected = []
+        total = len(selected)
+        for idx, (category, s) in enumerate(selected, 1):
+            iframe = s.get("iframe") or s.get("url") or ""
+            title, attrs = entry_for(category, s)
+            await to_resolve.put(
+                {"idx": idx, "title": title, "attrs": attrs, "iframe": iframe, "found": [], "tier": None}
+            )
+        await to_resolve.put(DONE)
+
+    async def resolve(item):
+        iframe = item["iframe"]
+        if iframe and ("pooembed" in iframe or "embed" in iframe):
+            try:
+                item["found"], item["tier"] = await resolve_embed(client, browser, routes, pages, iframe)
+                if not item["found"]:
+                    tiers["unresolved"] += 1
+                    print(f"[{item['idx']}/{total}] no m3u8 extracted; keeping iframe")
+            except Exception as e:
+                tiers["error"] += 1
+                print(f"[{item['idx']}/{total}] error extracting {iframe}: {e}")
+        return item
+
+    async def validate(item):
+        nonlocal validated
+        item["uri"] = item["iframe"]
+        if not item["found"]:
+            return item
+        parts = urlsplit(item["iframe"])
+        headers = {**HTTP_HEADERS, "Referer": f"{parts.scheme}://{parts.netloc}/"}
+        uri = await first_playlist(client, item["found"], headers)
+        if uri is None and item["tier"] == "http":
+            # static HTML can carry stale or decoy URLs; let the player pick the live one
+            print(f"[{item['idx']}/{total}] no HTTP-tier URL serves a playlist; retrying in browser")
+            found, tier = await resolve_embed(client, browser, routes, pages, item["iframe"], skip_http=True)
+            if found:
+                item["found"], item["tier"] = found, tier
+                uri = await first_playlist(client, found, headers)
+        if uri is not None:
+            validated += 1
+        tiers[item["tier"]] += 1
+        # first candidate that really serves a playlist; else the first one, as before
+        item["uri"] = uri or item["found"][0]
+        print(f"[{item['idx']}/{total}] extracted via {item['tier']}: {item['uri']}")
+        return item
+
+    async def write() -> int:
+        # entries finish out of order; hold each until all before it are written
+        pending, next_idx = {}, 1
+        with PlaylistWriter(OUT_M3U, keep_empty=False) as playlist:
+            while (item := await to_write.get()) is not DONE:
+                pending[item["idx"]] = item
+                while next_idx in pending:
+                    done = pending.pop(next_idx)
+                    playlist.add(done["uri"], done["title"], **done["attrs"])
+                    next_idx += 1
+        return playlist.count
+
+    *_, written = await asyncio.gather(
+        produce(),
+        run_stage(to_resolve, to_validate, resolve, RESOLVE_WORKERS),
+        run_stage(to_validate, to_write, validate, VALIDATE_WORKERS),
+        write(),
+    )
+    if not written:
+        print("No streams for today+tomorrow found in API")
+        return 0
+
+    print(f"Wrote {OUT_M3U} with {written} entries")
+    print("Resolved by tier: " + ", ".join(f"{k}: {v}" for k, v in tiers.most_common()))
+    print(f"Validated playlists: {validated}/{written}")
+    print(routes.summary())
+    print(browser.summary())
+    return written
+
+
+async def run() -> int:
+    async with (
+        httpx.AsyncClient(headers=HTTP_HEADERS, follow_redirects=True, timeout=10) as client,
+        async_playwright() as p,
+    ):
+        # Step 1: fetch API (if needed)
+        if not await fetch_api(client):
             print("No API data available; aborting")
             return 1
 
-    # Step 2: build final m3u
-    count = build_m3u_from_api(data)
+        # Step 2: filter, resolve, validate and write the final m3u
+        browser = SharedBrowser(p)
+        try:
+            count = await build_m3u_from_api(client, browser, API_FILE)
+        finally:
+            await browser.close()
     if count == 0:
         print("No entries written.")
     return 0
 
 
+def main():
+    return asyncio.run(run())
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
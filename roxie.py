@@ -1,55 +1,26 @@
 import asyncio
-import re
 from functools import partial
 from urllib.parse import urljoin
 
 import httpx
 from selectolax.parser import HTMLParser
 
-# Placeholder utils module
-class Cache:
-    def __init__(self, filename, exp):
-        self.filename = filename
-        self.exp = exp
-    def load(self):
-        return {}
-    def write(self, data):
-        pass
-
-class Time:
-    @staticmethod
-    def now():
-        import datetime
-        return datetime.datetime.now()
-    def __init__(self, dt=None):
-        import datetime
-        self._dt = dt or datetime.datetime.now()
-
-    @staticmethod
-    def now():
-        import datetime
-        return Time(datetime.datetime.now())
-
-    @staticmethod
-    def clean(dt):
-        # Wrap a datetime in Time, or return as-is if already Time
-        if isinstance(dt, Time):
-            return dt
-        return Time(dt)
-
-    @staticmethod
-    def from_str(s, timezone=None):
-        import datetime
-        # Placeholder: always returns now
-        return Time(datetime.datetime.now())
-
-    def delta(self, minutes=0):
-        import datetime
-        return Time(self._dt + datetime.timedelta(minutes=minutes))
-
-    def timestamp(self):
-        return self._dt.timestamp()
+from utils import (
+    DEFERRED,
+    Cache,
+    EventIndex,
+    HLSProber,
+    HostLimiter,
+    Lifecycle,
+    PlaylistWriter,
+    Scheduler,
+    Time,
+    extract_first,
+    get_with_retry,
+    parse_epochs,
+)
 
+# Placeholder utils module
 class Logger:
     def info(self, msg):
         print(msg)
@@ -87,27 +58,38 @@ SPORT_ENDPOINTS = {
     "soccer": "Soccer",
 }
 TAG = "ROXIE"
+EVENT_CONCURRENCY = 16
+EVENT_PER_HOST = 6
+WINDOW = 1_800
+RUN_BUDGET = 180
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Referer": "https://roxiestreams.live/",
+}
+PROBER = HLSProber(
+    headers=HEADERS,
+    limit=16,
+    per_host=4,
+    cache=Cache("roxie-live.json", exp=300),
+)
+LIFECYCLE = Lifecycle()
 
 async def process_event(
     client: httpx.AsyncClient,
     url: str,
     url_num: int,
+    limiter: HostLimiter | None = None,
 ) -> str | None:
     try:
-        r = await client.get(url)
-        r.raise_for_status()
+        r = await get_with_retry(client, url, limiter)
     except Exception as e:
         log.error(f'URL {url_num}) Failed to fetch "{url}": {e}')
         return
-    valid_m3u8 = re.compile(
-        r"showPlayer\(['\"]clappr['\"],\s*['\"]([^'\"]+?\.m3u8(?:\?[^'\"]*)?)['\"]\)",
-        re.IGNORECASE,
-    )
-    if not (match := valid_m3u8.search(r.text)):
+    if not (url := extract_first(r.text, source="roxie")):
         log.info(f"URL {url_num}) No M3U8 found")
         return
     log.info(f"URL {url_num}) Captured M3U8")
-    return match[1]
+    return url
 
 async def refresh_html_cache(
     client: httpx.AsyncClient,
@@ -122,7 +104,7 @@ async def refresh_html_cache(
         log.error(f'Failed to fetch "{url}": {e}')
         return {}
     soup = HTMLParser(r.content)
-    events = {}
+    rows = []
     for row in soup.css("table#eventsTable tbody tr"):
         if not (a_tag := row.css_first("td a")):
             continue
@@ -131,15 +113,22 @@ async def refresh_html_cache(
             continue
         if not (span := row.css_first("span.countdown-timer")):
             continue
-        data_start = span.attributes["data-start"].rsplit(":", 1)[0]
-        event_dt = Time.from_str(data_start, timezone="PST")
-        event_sport = SPORT_ENDPOINTS[sport]
+        if not (data_start := span.attributes.get("data-start")):
+            continue
+        rows.append((event, href, data_start.rsplit(":", 1)[0]))
+    # start times are wall-clock Pacific; convert the whole page in one pass
+    starts = parse_epochs([start for _, _, start in rows], timezone="PST")
+    event_sport = SPORT_ENDPOINTS[sport]
+    events = {}
+    for (event, href, _), event_ts in zip(rows, starts):
+        if event_ts is None:
+            continue
         key = f"[{event_sport}] {event} ({TAG})"
         events[key] = {
             "sport": event_sport,
             "event": event,
             "link": href,
-            "event_ts": event_dt.timestamp(),
+            "event_ts": event_ts,
             "timestamp": now_ts,
         }
     return events
@@ -165,25 +154,29 @@ async def get_events(
         events = {k: v for data in results for k, v in data.items()}
         HTML_CACHE.write(events)
     live = []
-    start_ts = now.delta(minutes=-30).timestamp()
-    end_ts = now.delta(minutes=30).timestamp()
-    for k, v in events.items():
+    index = EventIndex(events.items(), lambda kv: kv[1].get("event_ts"))
+    start_ts = now.delta(seconds=-WINDOW).timestamp()
+    end_ts = now.delta(seconds=WINDOW).timestamp()
+    for k, v in index.between(start_ts, end_ts):
         # Filter out short videos/highlights by keywords in event name
         event_name = v["event"].lower()
         if (
             cached_keys & {k}
-            or not start_ts <= v["event_ts"] <= end_ts
             or any(word in event_name for word in ["highlight", "short", "recap", "mini", "replay"])
         ):
             continue
         live.append({**v})
     return live
 
-async def scrape(client: httpx.AsyncClient) -> None:
-    cached_urls = CACHE_FILE.load()
+async def scrape(client: httpx.AsyncClient, budget: float | None = RUN_BUDGET) -> dict[str, dict]:
+    scheduler = Scheduler(budget, limit=EVENT_CONCURRENCY, start="event_ts")
+    known = CACHE_FILE.load()
+    # expiring or dead entries are dropped here and resolved again below
+    cached_urls, _ = await LIFECYCLE.triage(client, PROBER, known)
     cached_count = len(cached_urls)
     urls.update(cached_urls)
-    log.info(f"Loaded {cached_count} event(s) from cache")
+    log.info(f"Loaded {len(known)} event(s) from cache")
+    log.info(LIFECYCLE.summary())
     log.info(f'Scraping from "{BASE_URL}"')
     sport_urls = {sport: urljoin(BASE_URL, sport) for sport in SPORT_ENDPOINTS}
     events = await get_events(
@@ -191,69 +184,57 @@ async def scrape(client: httpx.AsyncClient) -> None:
         sport_urls,
         set(cached_urls.keys()),
     )
+    events = scheduler.order(events)
     log.info(f"Processing {len(events)} new URL(s)")
-    if events:
-        for i, ev in enumerate(events, start=1):
-            handler = partial(
-                process_event,
-                client=client,
-                url=ev["link"],
-                url_num=i,
-            )
-            url = await network.safe_process(
-                handler,
+    limiter = HostLimiter(limit=EVENT_CONCURRENCY, per_host=EVENT_PER_HOST, min_interval=0.1)
+    tasks = [
+        scheduler.run(
+            partial(
+                network.safe_process,
+                partial(
+                    process_event,
+                    client=client,
+                    url=ev["link"],
+                    url_num=i,
+                    limiter=limiter,
+                ),
                 url_num=i,
                 log=log,
             )
-            if url:
-                sport, event, ts = ev["sport"], ev["event"], ev["event_ts"]
-                tvg_id, logo = leagues.get_tvg_info(sport, event)
-                key = f"[{sport}] {event} ({TAG})"
-                entry = {
-                    "url": url,
-                    "logo": logo,
-                    "base": BASE_URL,
-                    "timestamp": ts,
-                    "id": tvg_id or "Live.Event.us",
-                }
-                urls[key] = cached_urls[key] = entry
+        )
+        for i, ev in enumerate(events, start=1)
+    ]
+    for ev, url in zip(events, await asyncio.gather(*tasks)):
+        if url and url is not DEFERRED:
+            sport, event, ts = ev["sport"], ev["event"], ev["event_ts"]
+            tvg_id, logo = leagues.get_tvg_info(sport, event)
+            key = f"[{sport}] {event} ({TAG})"
+            entry = {
+                "url": url,
+                "logo": logo,
+                "base": BASE_URL,
+                "timestamp": ts,
+                "id": tvg_id or "Live.Event.us",
+            }
+            urls[key] = cached_urls[key] = LIFECYCLE.stamp(entry)
+    log.info(scheduler.summary())
     if new_count := len(cached_urls) - cached_count:
         log.info(f"Collected and cached {new_count} new event(s)")
     else:
         log.info("No new events found")
     CACHE_FILE.write(cached_urls)
 
-    # Also export live streaming events to roxie.json for API/debugging
-    import json
-    with open("roxie.json", "w", encoding="utf-8") as jf:
-        json.dump(urls, jf, ensure_ascii=False, indent=2)
-
     # Export only working links to M3U playlist
-    m3u_lines = ['#EXTM3U']
-    for key, entry in cached_urls.items():
-        url = entry["url"]
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Referer": "https://roxiestreams.live/"
-        }
-        try:
-            resp = await client.get(url, headers=headers, timeout=10)
-            if resp.status_code == 200 and (
-                "application/vnd.apple.mpegurl" in resp.headers.get("content-type", "") or ".m3u8" in url
-            ):
-                # Check that the playlist is not empty
-                if resp.text.strip():
-                    m3u_lines.append(f'#EXTINF:-1 tvg-id="{entry.get("id", "")}" tvg-logo="{entry.get("logo", "")}",{key}')
-                    m3u_lines.append(url)
-                else:
-                    log.info(f"Skipping empty playlist: {url}")
-            else:
-                log.info(f"Skipping non-working link: {url} (status {resp.status_code})")
-        except Exception as e:
-            log.info(f"Skipping non-working link: {url} ({e})")
-    with open("roxie.m3u", "w", encoding="utf-8") as f:
-        f.write("\n".join(m3u_lines))
+    live = await PROBER.filter_live(client, cached_urls)
+    log.info(
+        f"Probed {len(cached_urls)} playlist(s): {len(live)} live, "
+        f"{PROBER.checked} checked, {PROBER.cache_hits} from cache"
+    )
+    with PlaylistWriter("roxie.m3u") as playlist:
+        for key, entry in live.items():
+            playlist.add(entry["url"], key, tvg_id=entry.get("id"), tvg_name=key, tvg_logo=entry.get("logo"))
     log.info("Exported working events to roxie.m3u")
+    return live
 
 if __name__ == "__main__":
     async def main():
@@ -0,0 +1,130 @@
+import json
+
+import pytest
+
+from utils import apistream
+from utils.apistream import FIELDS, SKIP_CATEGORIES, iter_streams
+
+PAYLOAD = {
+    "success": True,
+    "meta": {"note": 'braces } ] in "strings" [ {', "nested": [{"a": [1, 2, {"b": "]"}]}]},
+    "streams": [
+        {
+            "category": "Football",
+            "id": 1,
+            "streams": [
+                {
+                    "id": 101,
+                    "name": 'Team "A" vs Team {B}',
+                    "starts_at": 1_760_000_000,
+                    "ends_at": 1_760_007_200,
+                    "iframe": "https://pooembed.top/embed/101",
+                    "viewers": 12345678901234,
+                    "extra": {"dropped": ["x", "]"]},
+                },
+                {
+                    "id": 102,
+                    "name": "Café \\ back\\\\slash — 🏆",
+                    "starts_at": 1_760_050_000,
+                    "always_live": False,
+                    "viewers": -1.5e3,
+                },
+            ],
+        },
+        {
+            # category after its streams: records are held until the name is known
+            "streams": [{"id": 201, "name": "Late category", "starts_at": 1_760_001_000}],
+            "category": "Basketball",
+        },
+        {"category": "24/7 Streams", "streams": [{"id": 301, "name": "Always on", "starts_at": 1}]},
+        {"category": "Empty", "streams": []},
+        {
+            "streams": [{"id": 401, "name": "Late skipped", "starts_at": 1_760_000_500}],
+            "category": "24/7 Streams",
+        },
+    ],
+    "trailer": [1, 2.5, None, "}"],
+}
+
+
+def expected(start=None, end=None, skip=SKIP_CATEGORIES):
+    out = []
+    for group in PAYLOAD["streams"]:
+        category = group.get("category")
+        if category in skip:
+            continue
+        for s in group["streams"]:
+            ts = s.get("starts_at")
+            if (start is not None and ts < start) or (end is not None and ts > end):
+                continue
+            out.append((category, {k: s[k] for k in FIELDS if k in s}))
+    return out
+
+
+@pytest.fixture
+def api_file(tmp_path):
+    path = tmp_path / "api.json"
+    path.write_text(json.dumps(PAYLOAD, indent=1), encoding="utf-8")
+    return path
+
+
+def test_matches_json_load(api_file):
+    assert list(iter_streams(api_file)) == expected()
+
+
+def test_compact_file(tmp_path):
+    path = tmp_path / "api.json"
+    path.write_text(json.dumps(PAYLOAD, separators=(",", ":"), ensure_ascii=False), encoding="utf-8")
+    assert list(iter_streams(path)) == expected()
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 3, 5, 7, 11, 64])
+def test_chunk_boundaries(api_file, monkeypatch, chunk):
+    # small chunks cut strings, escapes and numbers at every possible offset
+    monkeypatch.setattr(apistream, "CHUNK", chunk)
+    assert list(iter_streams(api_file)) == expected()
+    assert list(iter_streams(api_file, 1_760_000_000, 1_760_001_000)) == expected(
+        1_760_000_000, 1_760_001_000
+    )
+
+
+def test_window(api_file):
+    got = list(iter_streams(api_file, start=1_760_000_600))
+    assert [s["id"] for _, s in got] == [102, 201]
+    assert list(iter_streams(api_file, end=1_759_999_999)) == []
+
+
+def test_category_after_streams(api_file):
+    got = dict((s["id"], c) for c, s in iter_streams(api_file))
+    assert got[201] == "Basketball"
+    assert 401 not in got
+
+
+def test_skip_categories(api_file):
+    got = list(iter_streams(api_file, skip_categories=()))
+    assert ("24/7 Streams", {"id": 301, "name": "Always on", "starts_at": 1}) in got
+    assert got == expected(skip=())
+
+
+def test_fields(api_file):
+    got = list(iter_streams(api_file, fields=("id",)))
+    assert [s for _, s in got] == [{"id": 101}, {"id": 102}, {"id": 201}]
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 3, 4])
+def test_escaped_text(tmp_path, monkeypatch, chunk):
+    # escapes as upstream sends them, not as json.dumps would write them
+    text = r'{"streams":[{"category":"A\"B","streams":[{"id":7,"iframe":"https:\/\/x.io\/e\/7","name":"\u00e9\\\"}"}]}]}'
+    monkeypatch.setattr(apistream, "CHUNK", chunk)
+    path = tmp_path / "api.json"
+    path.write_text(text, encoding="utf-8")
+    group = json.loads(text)["streams"][0]
+    assert list(iter_streams(path)) == [(group["category"], group["streams"][0])]
+
+
+@pytest.mark.parametrize("text", ['{"streams": [{"category": "A", "streams": [{"id": 1}', '{"streams": [1 2]}'])
+def test_malformed(tmp_path, text):
+    path = tmp_path / "api.json"
+    path.write_text(text, encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_streams(path))
@@ -0,0 +1,122 @@
+import json
+import os
+import time
+
+from utils import caching
+from utils.caching import Cache
+
+
+def lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f.read().splitlines()]
+
+
+def entry(n, ts=None):
+    return {"url": f"https://cdn.example/{n}.m3u8", "timestamp": ts or time.time()}
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "c.json")
+    data = {"a": entry(1), "b": entry(2)}
+    Cache(path, exp=60).write(data)
+    assert Cache(path, exp=60).load() == data
+
+
+def test_appends_only_changes(tmp_path):
+    path = str(tmp_path / "c.json")
+    cache = Cache(path, exp=60)
+    data = {"a": entry(1), "b": entry(2)}
+    cache.write(data)
+    data["b"] = entry(3)
+    cache.write(data)
+    assert [r["k"] for r in lines(path)] == ["a", "b", "b"]
+    cache.write(data)
+    assert len(lines(path)) == 3
+    assert Cache(path, exp=60).load() == data
+
+
+def test_tombstone(tmp_path):
+    path = str(tmp_path / "c.json")
+    cache = Cache(path, exp=60)
+    cache.write({"a": entry(1), "b": entry(2)})
+    cache.write({"a": entry(1)})
+    assert lines(path)[-1] == {"k": "b"}
+    assert Cache(path, exp=60).load().keys() == {"a"}
+    # a key written again after its delete is live again
+    Cache(path, exp=60).write({"a": entry(1), "b": entry(4)})
+    assert Cache(path, exp=60).load()["b"]["url"].endswith("/4.m3u8")
+
+
+def test_expired_entries_get_no_tombstone(tmp_path):
+    path = str(tmp_path / "c.json")
+    cache = Cache(path, exp=60)
+    a = entry(2)
+    cache.write({"old": entry(1, ts=time.time() - 120), "a": a})
+    cache.write({"a": a})
+    assert len(lines(path)) == 2
+    assert Cache(path, exp=60).load().keys() == {"a"}
+
+
+def test_compaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(caching, "MIN_DEAD", 4)
+    path = str(tmp_path / "c.json")
+    cache = Cache(path, exp=60)
+    data = {"a": entry(0), "b": entry(0)}
+    cache.write(data)
+    for n in range(1, 6):
+        data["a"] = entry(n)
+        cache.write(data)
+    # 2 live keys, and dead lines exceeded max(2, MIN_DEAD) on the last write
+    assert [r["k"] for r in lines(path)] == ["a", "b"]
+    assert not os.path.exists(f"{path}.tmp")
+    assert Cache(path, exp=60).load() == data
+
+
+def test_legacy_file_migrated(tmp_path):
+    path = str(tmp_path / "c.json")
+    data = {"a": entry(1), "b": entry(2)}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    cache = Cache(path, exp=60)
+    assert cache.load() == data
+    cache.write(data)
+    assert lines(path) == [{"k": "a", "v": data["a"]}, {"k": "b", "v": data["b"]}]
+    assert Cache(path, exp=60).load() == data
+
+
+def test_torn_final_line(tmp_path):
+    path = str(tmp_path / "c.json")
+    Cache(path, exp=60).write({"a": entry(1)})
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"k":"b","v":{"url":"htt')  # interrupted append
+    cache = Cache(path, exp=60)
+    assert cache.load().keys() == {"a"}
+    cache.write({"a": entry(1), "c": entry(3)})
+    assert Cache(path, exp=60).load().keys() == {"a", "c"}
+
+
+def test_per_entry_expiry(tmp_path):
+    path = str(tmp_path / "c.json")
+    Cache(path, exp=60).write({"old": entry(1, ts=time.time() - 120), "new": entry(2)})
+    assert Cache(path, exp=60).load().keys() == {"new"}
+    assert Cache(path, exp=None).load().keys() == {"old", "new"}
+
+
+def test_blob_expiry(tmp_path):
+    path = str(tmp_path / "c.json")
+    cache = Cache(path, exp=60)
+    cache.write({"a": [1, 2]})
+    assert cache.load(per_entry=False) == {"a": [1, 2]}
+    stale = time.time() - 120
+    os.utime(path, (stale, stale))
+    assert Cache(path, exp=60).load(per_entry=False) == {}
+    # an unchanged write still refreshes the mtime
+    cache.write({"a": [1, 2]})
+    assert Cache(path, exp=60).load(per_entry=False) == {"a": [1, 2]}
+
+
+def test_missing_or_corrupt(tmp_path):
+    path = tmp_path / "c.json"
+    assert Cache(str(path), exp=60).load() == {}
+    path.write_text("not json", encoding="utf-8")
+    assert Cache(str(path), exp=60).load() == {}
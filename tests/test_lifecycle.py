@@ -0,0 +1,79 @@
+import asyncio
+import base64
+import copy
+import json
+import time
+
+import httpx
+
+from utils.lifecycle import FRESH, RESOLVE, STALE, WAIT, Lifecycle, token_expiry
+from utils.probe import HLSProber
+
+PLAYLIST = "#EXTM3U\n#EXT-X-TARGETDURATION:4\n#EXTINF:4,\nseg.ts\n"
+
+
+def handler(request):
+    if request.url.host == "dead.example":
+        return httpx.Response(404)
+    if request.url.path.endswith(".ts"):
+        return httpx.Response(200)
+    return httpx.Response(200, text=PLAYLIST)
+
+
+def triage(entries):
+    async def main():
+        lifecycle = Lifecycle()
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await lifecycle.triage(client, HLSProber(), entries), lifecycle
+
+    return asyncio.run(main())
+
+
+def test_token_expiry():
+    assert token_expiry("https://cdn.example/a.m3u8?exp=1766110000") == 1_766_110_000
+    assert token_expiry("https://cdn.example/a.m3u8?e=1766110000000") == 1_766_110_000
+    assert token_expiry("https://cdn.example/a.m3u8?hdnts=st=1~exp=1766110000~hmac=ab") == 1_766_110_000
+    claims = base64.urlsafe_b64encode(json.dumps({"exp": 1_766_110_000}).encode()).decode().rstrip("=")
+    assert token_expiry(f"https://cdn.example/a.m3u8?token=eyJhbGciOiJIUzI1NiJ9.{claims}.sig") == 1_766_110_000
+    assert token_expiry("https://cdn.example/a.m3u8") is None
+
+
+def test_state():
+    now = time.time()
+    lifecycle = Lifecycle(verify_after=900, margin=300, retry_after=1_800)
+    assert lifecycle.state({"url": "https://a/x.m3u8", "checked": now - 60}, now) == FRESH
+    assert lifecycle.state({"url": "https://a/x.m3u8", "checked": now - 3_600}, now) == STALE
+    assert lifecycle.state({"url": f"https://a/x.m3u8?exp={int(now) + 60}", "checked": now}, now) == RESOLVE
+    assert lifecycle.state({"url": None, "checked": now - 60}, now) == WAIT
+    assert lifecycle.state({"url": None, "checked": now - 3_600}, now) == RESOLVE
+
+
+def test_verified_entries_are_left_unchanged():
+    # a successful re-check must not touch the entry, or Cache.write
+    # would append every cached entry again on every cron run
+    old = time.time() - 3_600
+    entries = {
+        "live": {"url": "https://cdn.example/a.m3u8", "checked": old, "expires": None},
+        "dead": {"url": "https://dead.example/b.m3u8", "checked": old, "expires": None},
+    }
+    before = copy.deepcopy(entries)
+    (keep, redo), lifecycle = triage(entries)
+    assert keep == {"live": before["live"]}
+    assert redo == {"dead"}
+    assert entries["live"] == before["live"]
+    assert lifecycle.counts["verified"] == 1
+
+
+def test_alternate_promoted():
+    entries = {
+        "a": {
+            "url": "https://dead.example/1.m3u8",
+            "alternates": ["https://dead.example/2.m3u8", "https://cdn.example/3.m3u8"],
+            "checked": time.time() - 3_600,
+        }
+    }
+    (keep, redo), lifecycle = triage(entries)
+    assert keep["a"]["url"] == "https://cdn.example/3.m3u8"
+    assert keep["a"]["alternates"] == []
+    assert redo == set()
+    assert lifecycle.counts["promoted"] == 2
@@ -0,0 +1,36 @@
+import os
+import time
+
+from utils.mirrors import MirrorHealth
+
+
+def test_order_and_failures(tmp_path):
+    health = MirrorHealth(str(tmp_path / "h.json"))
+    health.record("a", 0.4)
+    health.record("b", 0.1)
+    health.record("c", None)
+    assert health.order(["a", "b", "c", "d"]) == ["b", "a", "d"]
+    health.data["c"]["checked"] = time.time() - 3_600
+    assert "c" in health.order(["a", "b", "c"])
+
+
+def test_unchanged_health_is_not_rewritten(tmp_path):
+    path = str(tmp_path / "h.json")
+    health = MirrorHealth(path)
+    health.record("a", 0.41)
+    health.record("b", None)
+    health.save()
+    before = open(path).read()
+
+    # jitter within DRIFT and a repeat failure inside fail_ttl change nothing
+    again = MirrorHealth(path)
+    again.record("a", 0.46)
+    again.record("b", None)
+    os.utime(path, ns=(0, 0))
+    again.save()
+    assert os.stat(path).st_mtime_ns == 0
+    assert open(path).read() == before
+
+    again.record("a", 1.2)
+    again.save()
+    assert MirrorHealth(path).data["a"] == {"ok": True, "latency": 1.2}
@@ -0,0 +1,55 @@
+import asyncio
+
+from utils.schedule import DEFERRED, Scheduler, priority
+
+NOW = 1_766_110_000
+
+
+def ppv_event(name, starts_at, ends_at, viewers):
+    # shaped like ppv.get_events output; the API sends `viewers` as a string
+    return {
+        "sport": "American Football",
+        "event": name,
+        "link": f"https://pooembed.top/embed/nfl/{name}",
+        "logo": None,
+        "timestamp": float(starts_at),
+        "ends_at": ends_at,
+        "viewers": viewers,
+    }
+
+
+def test_order_with_api_shaped_records():
+    events = [
+        ppv_event("later", NOW + 7_200, NOW + 18_000, "0"),
+        ppv_event("ended", NOW - 20_000, NOW - 7_000, "900"),
+        ppv_event("live-small", NOW - 1_000, NOW + 9_000, "12"),
+        ppv_event("soon", NOW + 600, NOW + 11_000, "0"),
+        ppv_event("live-big", NOW - 3_000, NOW + 7_000, "1534"),
+        ppv_event("no-viewers", NOW - 500, NOW + 9_000, None),
+    ]
+    order = [ev["event"] for ev in Scheduler().order(events, now=NOW)]
+    assert order == ["live-big", "live-small", "no-viewers", "soon", "later", "ended"]
+
+
+def test_priority_tolerates_bad_values():
+    assert priority(NOW - 10, "", "n/a", NOW) == (0, 0, 10)
+    assert priority(NOW - 10, None, "12.0", NOW) == (0, -12, 10)
+    assert priority(None, None, "5", NOW) == (3, 0, 0)
+    assert priority(NOW + 60, None, "nan", NOW) == (1, 60, 0)
+
+
+def test_run_defers_after_budget():
+    async def main():
+        scheduler = Scheduler(budget=0, limit=2)
+        return await asyncio.gather(*(scheduler.run(lambda: asyncio.sleep(0)) for _ in range(3)))
+
+    assert asyncio.run(main()) == [DEFERRED] * 3
+
+
+def test_run_within_budget():
+    async def main():
+        scheduler = Scheduler(budget=60, limit=2)
+        results = await asyncio.gather(*(scheduler.run(lambda i=i: asyncio.sleep(0, i)) for i in range(3)))
+        return results, scheduler.ran, scheduler.deferred
+
+    assert asyncio.run(main()) == ([0, 1, 2], 3, 0)
@@ -0,0 +1,63 @@
+import asyncio
+from collections import Counter
+
+import httpx
+
+import watchfooty
+
+BASE = "https://www.watchfooty.top"
+SOURCES = "https://api.watchfooty.st/api/v1/player/abc-123/sources?lang=en"
+
+
+class FakeResponse:
+    def __init__(self, url, content_type, body):
+        self.url = url
+        self.headers = {"content-type": content_type}
+        self.body = body
+
+    async def text(self):
+        return self.body
+
+
+class FakePage:
+    def __init__(self):
+        self.handlers = []
+
+    def on(self, event, handler):
+        self.handlers.append(handler)
+
+    def emit(self, response):
+        for handler in self.handlers:
+            asyncio.run(handler(response))
+
+
+def test_learns_endpoint_from_player_traffic():
+    learned = {}
+    page = FakePage()
+    watchfooty.watch_endpoints(page, "abc-123", learned)
+    page.emit(FakeResponse(f"{BASE}/stream/abc-123", "text/html", 'src="https://cdn.x/a.m3u8"'))
+    page.emit(FakeResponse("https://api.watchfooty.st/api/v1/match/abc-1234", "application/json", '"https://cdn.x/a.m3u8"'))
+    page.emit(FakeResponse(SOURCES.replace("sources", "stats"), "application/json", '{"viewers": 10}'))
+    assert learned == {}
+    page.emit(FakeResponse(SOURCES, "application/json; charset=utf-8", '{"src":"https:\\/\\/cdn.x\\/a.m3u8"}'))
+    assert list(learned) == ["https://api.watchfooty.st/api/v1/player/{match_id}/sources?lang=en"]
+
+
+def test_resolve_direct_uses_learned_endpoint():
+    def handler(request):
+        if request.url.path == "/api/v1/player/m1/sources":
+            return httpx.Response(200, json={"sources": ["https://cdn.x/live.m3u8", "https://dead.x/b.m3u8"]})
+        if request.url.host == "cdn.x":
+            return httpx.Response(200, text="#EXTM3U\n")
+        return httpx.Response(404)
+
+    async def main(match_id, endpoints):
+        hits = Counter()
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            found = await watchfooty.resolve_direct(client, BASE, [], match_id, endpoints, hits)
+        return found, hits
+
+    template = "https://api.watchfooty.st/api/v1/player/{match_id}/sources"
+    assert asyncio.run(main("m1", [template])) == (["https://cdn.x/live.m3u8"], Counter({template: 1}))
+    assert asyncio.run(main("m2", [template])) == ([], Counter())
+    assert asyncio.run(main("m1", [])) == ([], Counter())
@@ -0,0 +1,54 @@
+from .api import CachedAPI
+from .apistream import iter_streams
+from .browser import BrowserSession, M3U8Capture, SharedBrowser, browser_context
+from .caching import Cache
+from .extract import extract_first, extract_m3u8, find_m3u8_in_html, register
+from .lifecycle import Lifecycle, token_expiry
+from .merge import merge_sources, normalize_name, write_master
+from .mirrors import MirrorHealth, fastest_mirror, first_response
+from .playlist import PlaylistWriter
+from .predict import URLPredictor
+from .probe import HLSProber, probe_stream
+from .routing import RouteFilter
+from .schedule import DEFERRED, Scheduler
+from .throttle import HostLimiter, get_with_retry
+from .times import Time, parse_epochs, to_epochs
+from .validate import PlaylistValidator, is_playlist
+from .window import EventIndex
+
+__all__ = [
+    "DEFERRED",
+    "BrowserSession",
+    "Cache",
+    "CachedAPI",
+    "EventIndex",
+    "HLSProber",
+    "HostLimiter",
+    "Lifecycle",
+    "M3U8Capture",
+    "MirrorHealth",
+    "PlaylistValidator",
+    "PlaylistWriter",
+    "RouteFilter",
+    "Scheduler",
+    "SharedBrowser",
+    "Time",
+    "URLPredictor",
+    "browser_context",
+    "extract_first",
+    "extract_m3u8",
+    "fastest_mirror",
+    "find_m3u8_in_html",
+    "first_response",
+    "get_with_retry",
+    "is_playlist",
+    "iter_streams",
+    "merge_sources",
+    "normalize_name",
+    "parse_epochs",
+    "probe_stream",
+    "register",
+    "to_epochs",
+    "token_expiry",
+    "write_master",
+]
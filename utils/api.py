@@ -0,0 +1,99 @@
+"""Fetch-once access to a JSON API that is cached on disk.
+
+The payload is written to `filename` exactly as served and its
+validators (ETag, Last-Modified, fetch time, mirror) to a `.meta.json`
+sidecar. Within `exp` seconds of the last fetch the cached payload is
+used with no request at all; after that one conditional request is
+raced across the mirrors and a 304 just renews the cached copy.
+
+`get` never parses the payload; readers stream it from `filename`
+(see `apistream.iter_streams`) or query it by time through `index`.
+"""
+import json
+import os
+import time
+
+import httpx
+
+from .apistream import SKIP_CATEGORIES
+from .mirrors import MirrorHealth, first_response
+from .window import EventIndex
+
+
+class CachedAPI:
+    def __init__(self, filename: str, exp: float | None = None):
+        self.filename = filename
+        self.exp = exp
+        self.meta_file = f"{os.path.splitext(filename)[0]}.meta.json"
+        self.last_transfer = "none"
+
+    def meta(self) -> dict:
+        try:
+            with open(self.meta_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _write(self, path: str, data: bytes) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def available(self) -> bool:
+        return os.path.exists(self.filename) and os.path.getsize(self.filename) > 0
+
+    def index(self, skip_categories=SKIP_CATEGORIES) -> EventIndex:
+        return EventIndex.for_streams(self.filename, skip_categories)
+
+    def is_fresh(self, meta: dict, now: float | None = None) -> bool:
+        if self.exp is None or not (fetched := meta.get("fetched")):
+            return False
+        return (now or time.time()) - fetched < self.exp
+
+    async def get(
+        self,
+        client: httpx.AsyncClient,
+        mirrors: list[str],
+        health: MirrorHealth | None = None,
+        force: bool = False,
+        timeout: float = 10,
+    ) -> tuple[bool, str | None]:
+        meta = self.meta()
+        have = self.available()
+        if have and not force and self.is_fresh(meta):
+            self.last_transfer = "none (fresh cache)"
+            return True, meta.get("mirror")
+
+        headers = {}
+        if have:
+            if etag := meta.get("etag"):
+                headers["If-None-Match"] = etag
+            if modified := meta.get("last_modified"):
+                headers["If-Modified-Since"] = modified
+
+        url, r = await first_response(
+            client,
+            mirrors,
+            health,
+            timeout=timeout,
+            headers=headers,
+            accept=(200, 304),
+        )
+        if r is None:
+            self.last_transfer = "failed"
+            return have, None
+
+        meta = {**meta, "fetched": time.time(), "mirror": url}
+        if r.status_code == 304 and have:
+            self.last_transfer = "304 not modified"
+        elif r.content.lstrip()[:1] not in (b"{", b"["):
+            self.last_transfer = "failed (not JSON)"
+            return have, None
+        else:
+            meta["etag"] = r.headers.get("etag")
+            meta["last_modified"] = r.headers.get("last-modified")
+            self._write(self.filename, r.content)
+            self.last_transfer = f"{len(r.content)} bytes"
+        self._write(self.meta_file, json.dumps(meta).encode())
+        return True, url
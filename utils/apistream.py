@@ -0,0 +1,181 @@
+"""Lazy reader for the PPV `/api/streams` payload.
+
+`iter_streams` walks the file in chunks and yields `(category, stream)`
+pairs one at a time, keeping only `fields`. Skipped categories, and
+events outside `[start, end]` (by `starts_at`), are stepped over by
+bracket scanning and never decoded into Python objects, so memory stays
+flat however large the upstream catalogue gets.
+"""
+import json
+import re
+from collections.abc import Iterator
+
+CHUNK = 1 << 16
+WHITESPACE = " \t\r\n"
+
+# a complete string, a lone quote (string cut off at the buffer end), or a bracket
+TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|"|[\[\]{}]')
+STARTS_RE = re.compile(r'"starts_at"\s*:\s*(-?\d+)')
+
+FIELDS = (
+    "id",
+    "name",
+    "title",
+    "tag",
+    "poster",
+    "uri_name",
+    "starts_at",
+    "ends_at",
+    "always_live",
+    "iframe",
+    "url",
+    "viewers",
+)
+
+SKIP_CATEGORIES = frozenset({"24/7 Streams"})
+
+
+class _Reader:
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+
+    def fill(self) -> bool:
+        if not (chunk := self.f.read(CHUNK)):
+            return False
+        self.buf += chunk
+        return True
+
+    def compact(self) -> None:
+        # only called between values, when nothing holds an offset into buf
+        if self.pos > CHUNK:
+            self.buf = self.buf[self.pos :]
+            self.pos = 0
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON")
+
+    def expect(self, ch: str) -> None:
+        if (got := self.peek()) != ch:
+            raise ValueError(f"Expected {ch!r} at offset {self.pos}, got {got!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                val, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # a number ending exactly at the buffer edge may continue in the next chunk
+            if end < len(self.buf) or not self.fill():
+                self.pos = end
+                return val
+
+    def skip(self) -> tuple[int, int]:
+        if self.peek() not in "[{":
+            start = self.pos
+            self.value()
+            return start, self.pos
+        start = self.pos
+        while True:
+            depth = 0
+            for m in TOKEN_RE.finditer(self.buf, start):
+                tok = m[0]
+                if tok == '"':
+                    break
+                if tok[0] == '"':
+                    continue
+                depth += 1 if tok in "[{" else -1
+                if depth == 0:
+                    self.pos = m.end()
+                    return start, self.pos
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON")
+
+    def members(self) -> Iterator[str]:
+        # yields each key; the caller must consume its value before resuming
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            ch = self.peek()
+            self.pos += 1
+            if ch == "}":
+                return
+            if ch != ",":
+                raise ValueError(f"Expected ',' or '}}' at offset {self.pos - 1}")
+
+    def elements(self) -> Iterator[None]:
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield
+            ch = self.peek()
+            self.pos += 1
+            if ch == "]":
+                return
+            if ch != ",":
+                raise ValueError(f"Expected ',' or ']' at offset {self.pos - 1}")
+
+    def record(self, fields, start: float | None, end: float | None) -> dict | None:
+        lo, hi = self.skip()
+        span = self.buf[lo:hi]
+        if start is not None or end is not None:
+            if not (m := STARTS_RE.search(span)):
+                return None
+            ts = int(m[1])
+            if (start is not None and ts < start) or (end is not None and ts > end):
+                return None
+        obj = json.loads(span)
+        return {k: obj[k] for k in fields if k in obj}
+
+
+def iter_streams(
+    path,
+    start: float | None = None,
+    end: float | None = None,
+    skip_categories=SKIP_CATEGORIES,
+    fields=FIELDS,
+) -> Iterator[tuple[str | None, dict]]:
+    with open(path, "r", encoding="utf-8") as f:
+        r = _Reader(f)
+        for key in r.members():
+            if key != "streams":
+                r.skip()
+                continue
+            for _ in r.elements():
+                category, pending = None, []
+                for gkey in r.members():
+                    if gkey in ("category", "category_name") and category is None:
+                        category = r.value()
+                    elif gkey == "streams" and category not in skip_categories:
+                        for _ in r.elements():
+                            if (rec := r.record(fields, start, end)) is None:
+                                continue
+                            if category is None:
+                                pending.append(rec)
+                            else:
+                                yield category, rec
+                            r.compact()
+                    else:
+                        r.skip()
+                if category not in skip_categories:
+                    for rec in pending:
+                        yield category, rec
@@ -0,0 +1,231 @@
+"""Shared headless-browser helpers.
+
+`BrowserSession` launches Chromium once per run and hands out fresh pages
+from a small pool of warm contexts, recycling each context after
+`max_uses` pages so state from one embed doesn't leak into the rest.
+
+`SharedBrowser` is the async counterpart used when several scrapers run
+in one event loop: Chromium is launched on first use and each scraper
+gets its own context from it via `browser_context`.
+
+`M3U8Capture` watches a page's traffic and resolves as soon as the first
+HLS playlist is requested, replacing fixed sleeps and networkidle waits.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from playwright.async_api import async_playwright
+
+from .routing import RouteFilter
+
+HLS_CONTENT_TYPES = (
+    "application/vnd.apple.mpegurl",
+    "application/x-mpegurl",
+    "audio/mpegurl",
+    "audio/x-mpegurl",
+)
+
+
+class M3U8Capture:
+    def __init__(self, page):
+        self.page = page
+        self.urls: list[str] = []
+        self.found = asyncio.Event()
+
+    def __enter__(self):
+        self.page.on("request", self._on_request)
+        self.page.on("response", self._on_response)
+        return self
+
+    def __exit__(self, *exc):
+        self.page.remove_listener("request", self._on_request)
+        self.page.remove_listener("response", self._on_response)
+
+    def _add(self, url: str) -> None:
+        if url not in self.urls:
+            self.urls.append(url)
+            self.found.set()
+
+    def _on_request(self, request) -> None:
+        if ".m3u8" in request.url:
+            self._add(request.url)
+
+    def _on_response(self, response) -> None:
+        ctype = (response.headers.get("content-type") or "").lower()
+        if any(t in ctype for t in HLS_CONTENT_TYPES):
+            self._add(response.url)
+
+    @property
+    def first(self) -> str | None:
+        return self.urls[0] if self.urls else None
+
+    async def wait_during(self, action) -> str:
+        # Run `action` (e.g. a goto) and return as soon as a playlist shows up,
+        # even if the action itself is still in flight. Bound this with the
+        # caller's overall deadline.
+        act = asyncio.ensure_future(action)
+        hit = asyncio.ensure_future(self.found.wait())
+        try:
+            done, _ = await asyncio.wait({act, hit}, return_when=asyncio.FIRST_COMPLETED)
+            if hit not in done:
+                act.result()  # surface navigation errors
+                await hit
+            return self.first
+        finally:
+            for task in (act, hit):
+                if not task.done():
+                    task.cancel()
+                    try:
+                        await task
+                    except (asyncio.CancelledError, Exception):
+                        pass
+
+    def wait_sync(self, timeout: float, poll_ms: int = 100) -> str | None:
+        # Sync API only dispatches events while a Playwright call is running,
+        # so pump with short waits until the first playlist or the deadline.
+        deadline = time.monotonic() + timeout
+        while not self.urls and (left := deadline - time.monotonic()) > 0:
+            self.page.wait_for_timeout(min(poll_ms, left * 1000))
+        return self.first
+
+
+class BrowserSession:
+    def __init__(
+        self,
+        play,
+        headless: bool = True,
+        pool_size: int = 2,
+        max_uses: int = 20,
+        route_filter: RouteFilter | None = None,
+    ):
+        self.play = play
+        self.route_filter = route_filter or RouteFilter()
+        self.headless = headless
+        self.pool_size = max(1, pool_size)
+        self.max_uses = max(1, max_uses)
+        self.browser = None
+        self._idle: list[list] = []  # [context, uses]
+        self.launches = 0
+        self.contexts = 0
+        self.pages_served = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _ensure_browser(self):
+        if self.browser is None or not self.browser.is_connected():
+            self._idle.clear()
+            self.browser = self.play.chromium.launch(headless=self.headless)
+            self.launches += 1
+        return self.browser
+
+    def _checkout(self) -> list:
+        browser = self._ensure_browser()
+        if self._idle:
+            return self._idle.pop()
+        self.contexts += 1
+        context = browser.new_context()
+        self.route_filter.attach_sync(context)
+        return [context, 0]
+
+    def _checkin(self, slot: list) -> None:
+        context, uses = slot
+        if uses >= self.max_uses or len(self._idle) >= self.pool_size:
+            try:
+                context.close()
+            except Exception:
+                pass
+            return
+        self._idle.append(slot)
+
+    @contextmanager
+    def page(self):
+        slot = self._checkout()
+        page = slot[0].new_page()
+        slot[1] += 1
+        self.pages_served += 1
+        try:
+            yield page
+        finally:
+            try:
+                page.close()
+            except Exception:
+                pass
+            self._checkin(slot)
+
+    def close(self) -> None:
+        for context, _ in self._idle:
+            try:
+                context.close()
+            except Exception:
+                pass
+        self._idle.clear()
+        if self.browser is not None:
+            try:
+                self.browser.close()
+            except Exception:
+                pass
+            self.browser = None
+
+    def summary(self) -> str:
+        return (
+            f"Browser launches: {self.launches}, "
+            f"contexts: {self.contexts}, "
+            f"pages served: {self.pages_served}. "
+            f"{self.route_filter.summary()}"
+        )
+
+
+class SharedBrowser:
+    def __init__(self, play, headless: bool = True):
+        self.play = play
+        self.headless = headless
+        self.browser = None
+        self.launches = 0
+        self.contexts = 0
+        self._lock = asyncio.Lock()
+
+    async def new_context(self, **kwargs):
+        async with self._lock:
+            if self.browser is None or not self.browser.is_connected():
+                self.browser = await self.play.chromium.launch(headless=self.headless)
+                self.launches += 1
+        self.contexts += 1
+        return await self.browser.new_context(**kwargs)
+
+    async def close(self) -> None:
+        if self.browser is not None:
+            try:
+                await self.browser.close()
+            except Exception:
+                pass
+            self.browser = None
+
+    def summary(self) -> str:
+        return f"Browser launches: {self.launches}, contexts: {self.contexts}"
+
+
+@asynccontextmanager
+async def browser_context(browser=None, headless: bool = True):
+    # Use the caller's (shared) browser when given, else a private Chromium
+    # that lives only as long as this context.
+    if browser is not None:
+        context = await browser.new_context()
+        try:
+            yield context
+        finally:
+            try:
+                await context.close()
+            except Exception:
+                pass
+        return
+    async with async_playwright() as p:
+        own = await p.chromium.launch(headless=headless)
+        try:
+            yield await own.new_context()
+        finally:
+            await own.close()
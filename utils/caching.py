@@ -0,0 +1,128 @@
+"""Keyed cache stored as an append-only JSON-lines log.
+
+Each line is `{"k": key, "v": entry}`, or `{"k": key}` for a delete, and
+the last line for a key wins. `write` diffs the new mapping against what
+is already on disk and appends only the entries that changed, so a run
+that touches three events adds three short lines instead of rewriting
+the whole file. Once dead lines outnumber live ones the log is compacted
+into a fresh file (atomically, via `os.replace`).
+
+With `per_entry=True` (the default) each entry lives until its own
+`timestamp` plus `exp`; stale entries are dropped on load and vanish
+from disk at the next compaction. With `per_entry=False` the file is
+treated as one blob that expires `exp` seconds after it was written.
+
+Files in the old single-object format are still read, and are rewritten
+as a log on the next write.
+"""
+import json
+import os
+import time
+
+MIN_DEAD = 64
+
+
+def _line(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+class Cache:
+    def __init__(self, filename: str, exp: float | None = None):
+        self.filename = filename
+        self.exp = exp
+        # serialized value per key as currently on disk; None until read
+        self._disk: dict[str, str] | None = None
+        self._lines = 0
+        self._legacy = False
+        self._torn = False
+
+    def is_fresh(self, entry, now: float | None = None) -> bool:
+        if self.exp is None:
+            return True
+        if not isinstance(entry, dict) or not (ts := entry.get("timestamp")):
+            return False
+        return (now or time.time()) - float(ts) < self.exp
+
+    def _read(self) -> dict | None:
+        self._disk, self._lines, self._legacy, self._torn = {}, 0, False, False
+        if not os.path.exists(self.filename):
+            return None
+        try:
+            with open(self.filename, "r", encoding="utf-8") as f:
+                text = f.read()
+        except Exception:
+            return None
+        if not text.startswith('{"k":'):
+            return self._read_legacy(text)
+        self._torn = not text.endswith("\n")
+        data = {}
+        for raw in text.splitlines():
+            try:
+                record = json.loads(raw)
+                key = record["k"]
+            except Exception:
+                continue  # torn final line from an interrupted append
+            self._lines += 1
+            if "v" in record:
+                data[key] = record["v"]
+                self._disk[key] = _line(record)
+            else:
+                data.pop(key, None)
+                self._disk.pop(key, None)
+        return data
+
+    def _read_legacy(self, text: str) -> dict | None:
+        try:
+            data = json.loads(text)
+        except Exception:
+            return None
+        if not isinstance(data, dict):
+            return None
+        self._legacy = True
+        self._disk = {k: _line({"k": k, "v": v}) for k, v in data.items()}
+        return data
+
+    def load(self, per_entry: bool = True):
+        if (data := self._read()) is None:
+            return {}
+        if self.exp is None:
+            return data
+        now = time.time()
+        if not per_entry:
+            return data if now - os.path.getmtime(self.filename) < self.exp else {}
+        return {k: v for k, v in data.items() if self.is_fresh(v, now)}
+
+    def write(self, data: dict) -> None:
+        if self._disk is None:
+            self._read()
+        now = time.time()
+        changed = []
+        for key, value in data.items():
+            line = _line({"k": key, "v": value})
+            if self._disk.get(key) != line:
+                changed.append(line)
+                self._disk[key] = line
+        for key in [k for k in self._disk if k not in data]:
+            # expired entries are already invisible to `load`; leave them
+            # for compaction rather than spending a tombstone on each
+            value = json.loads(self._disk.pop(key))["v"]
+            if self.is_fresh(value, now):
+                changed.append(_line({"k": key}))
+        self._lines += len(changed)
+        if self._legacy or self._lines - len(data) > max(len(data), MIN_DEAD):
+            self._compact(data)
+        elif changed:
+            with open(self.filename, "a", encoding="utf-8") as f:
+                f.write("\n" * self._torn + "".join(changed))
+            self._torn = False
+        else:
+            # nothing changed, but keep the mtime current for `per_entry=False`
+            open(self.filename, "a").close()
+            os.utime(self.filename)
+
+    def _compact(self, data: dict) -> None:
+        tmp = f"{self.filename}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(self._disk[k] for k in data)
+        os.replace(tmp, self.filename)
+        self._lines, self._legacy, self._torn = len(data), False, False
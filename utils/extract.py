@@ -0,0 +1,113 @@
+"""Pull HLS playlist URLs out of static embed HTML.
+
+Many embeds ship the playlist URL in the page itself, either in plain
+text, inside a player call, base64-encoded or inside a p.a.c.k.e.r
+blob. Extractors are generators over one page, registered per source
+with `register`, so `extract_first` can stop scanning at the first hit
+and `extract_m3u8` can collect every distinct URL.
+"""
+import base64
+import binascii
+import re
+from collections.abc import Callable, Iterator
+from itertools import chain
+
+M3U8_RE = re.compile(r"https?:(?:\\?/){2}[^\"'\s>]+?\.m3u8[^\"'\s>]*")
+
+# Case-sensitive on the literal call name so the regex engine can skip
+# ahead with a fast substring search; with IGNORECASE it was ~25x slower
+# on the benchmark fixtures.
+PLAYER_RE = re.compile(
+    r"showPlayer\(['\"](?i:clappr)['\"],\s*['\"]([^'\"]+?\.m3u8(?:\?[^'\"]*)?)['\"]\)",
+)
+
+ATOB_RE = re.compile(r"atob\(\s*['\"]([A-Za-z0-9+/=]{16,})['\"]\s*\)")
+
+PACKED_RE = re.compile(
+    r"eval\(function\(p,a,c,k,e,[rd]\).*?\}\(\s*'(.*?)',\s*(\d+),\s*(\d+),\s*'(.*?)'\.split\('\|'\)",
+    re.DOTALL,
+)
+
+WORD_RE = re.compile(r"\b\w+\b")
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+Extractor = Callable[[str], Iterator[str]]
+
+REGISTRY: dict[str, list[Extractor]] = {}
+
+
+def register(*sources: str) -> Callable[[Extractor], Extractor]:
+    def wrap(fn: Extractor) -> Extractor:
+        for source in sources:
+            REGISTRY.setdefault(source, []).append(fn)
+        return fn
+
+    return wrap
+
+
+def _to_int(word: str, radix: int) -> int:
+    n = 0
+    for ch in word:
+        if (d := DIGITS.find(ch)) < 0 or d >= radix:
+            return -1
+        n = n * radix + d
+    return n
+
+
+def unpack(payload: str, radix: int, count: int, symtab: str) -> str:
+    words = symtab.split("|")
+
+    def lookup(m: re.Match) -> str:
+        idx = _to_int(m[0], radix)
+        if 0 <= idx < min(count, len(words)) and words[idx]:
+            return words[idx]
+        return m[0]
+
+    return WORD_RE.sub(lookup, payload.replace("\\'", "'"))
+
+
+@register("roxie", "generic")
+def from_player(html: str) -> Iterator[str]:
+    for m in PLAYER_RE.finditer(html):
+        yield m[1]
+
+
+@register("generic")
+def from_urls(html: str) -> Iterator[str]:
+    if ".m3u8" not in html:
+        return
+    for m in M3U8_RE.finditer(html):
+        yield m[0].replace("\\/", "/")
+
+
+@register("generic")
+def from_base64(html: str) -> Iterator[str]:
+    for m in ATOB_RE.finditer(html):
+        try:
+            text = base64.b64decode(m[1]).decode("utf-8", "ignore")
+        except (binascii.Error, ValueError):
+            continue
+        yield from from_urls(text)
+
+
+@register("generic")
+def from_packed(html: str) -> Iterator[str]:
+    for m in PACKED_RE.finditer(html):
+        yield from from_urls(unpack(m[1], int(m[2]), int(m[3]), m[4]))
+
+
+def _scan(html: str, source: str) -> Iterator[str]:
+    return chain.from_iterable(fn(html) for fn in REGISTRY.get(source, REGISTRY["generic"]))
+
+
+def extract_first(html: str, source: str = "generic") -> str | None:
+    return next(_scan(html, source), None)
+
+
+def extract_m3u8(html: str, source: str = "generic") -> list[str]:
+    return list(dict.fromkeys(_scan(html, source)))
+
+
+def find_m3u8_in_html(html: str) -> list[str]:
+    return list(dict.fromkeys(from_urls(html)))
@@ -0,0 +1,133 @@
+"""Decide which cached entries need work this run.
+
+A cached entry moves through four states:
+
+- fresh: resolved within `verify_after` seconds, and its URL token (if
+  any) is not about to expire. Left alone.
+- stale: resolved a while ago. It is probed, and counts as fresh for
+  this run if the stream still plays. The successful check is not
+  written back to the entry: the prober's own cache already holds the
+  result (and `filter_live` reuses it), while re-stamping would rewrite
+  every cached entry on every cron run. If it doesn't and the entry carries
+  `alternates` (other mirrors captured alongside it), the next one is
+  promoted and probed in its place. Only when none play does it move
+  to resolve.
+- resolve: the token expires within `margin` seconds, or the probe
+  failed. The entry is dropped so the scraper resolves the event again.
+- wait: resolution failed (`url` is None). It is retried once
+  `retry_after` seconds have passed since the failure.
+
+Token expiry comes from the URL itself. CDNs put it in the query string
+as `exp=`/`expires=`/`e=` (epoch seconds or ms), inside Akamai-style
+`hdnts=...~exp=...~` tokens, or as the `exp` claim of a JWT.
+"""
+import base64
+import json
+import re
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+
+from .times import to_seconds
+from .validate import PlaylistValidator
+
+FRESH, STALE, RESOLVE, WAIT = "fresh", "stale", "resolve", "wait"
+
+EXPIRY_PARAMS = frozenset({"exp", "expires", "expiry", "expire", "e", "validto", "valid_to", "deadline"})
+EMBEDDED_EXP_RE = re.compile(r"(?:^|[~&,:;])exp(?:ires)?=(\d{9,13})")
+JWT_RE = re.compile(r"^[\w-]+\.([\w-]+)\.[\w-]*$")
+
+
+def _jwt_exp(value: str) -> float | None:
+    if not (m := JWT_RE.match(value)):
+        return None
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(m[1] + "=" * (-len(m[1]) % 4)))
+    except Exception:
+        return None
+    return to_seconds(claims.get("exp")) if isinstance(claims, dict) else None
+
+
+def token_expiry(url: str | None) -> float | None:
+    if not url:
+        return None
+    found = []
+    for key, value in parse_qsl(urlsplit(url).query, keep_blank_values=True):
+        if key.lower() in EXPIRY_PARAMS and value.isdigit():
+            found.append(to_seconds(value))
+        elif m := EMBEDDED_EXP_RE.search(value):
+            found.append(to_seconds(m[1]))
+        elif (exp := _jwt_exp(value)) is not None:
+            found.append(exp)
+    # the earliest deadline is the one that bites
+    return min(found) if found else None
+
+
+class Lifecycle:
+    def __init__(self, verify_after: float = 900, margin: float = 300, retry_after: float = 1_800):
+        self.verify_after = verify_after
+        self.margin = margin
+        self.retry_after = retry_after
+        self.counts: dict[str, int] = {}
+
+    def stamp(self, entry: dict, now: float | None = None) -> dict:
+        entry["checked"] = time.time() if now is None else now
+        entry["expires"] = token_expiry(entry.get("url"))
+        return entry
+
+    def state(self, entry: dict, now: float | None = None) -> str:
+        now = time.time() if now is None else now
+        checked = entry.get("checked") or 0
+        if not entry.get("url"):
+            return WAIT if now - checked < self.retry_after else RESOLVE
+        if (expires := entry.get("expires", token_expiry(entry["url"]))) and expires - now < self.margin:
+            return RESOLVE
+        return FRESH if now - checked < self.verify_after else STALE
+
+    async def triage(
+        self,
+        client: httpx.AsyncClient,
+        prober: PlaylistValidator,
+        entries: dict[str, dict],
+    ) -> tuple[dict[str, dict], set[str]]:
+        """Split `entries` into those to keep as-is and keys to resolve again."""
+        now = time.time()
+        states = {k: self.state(v, now) for k, v in entries.items()}
+        verified = promoted = 0
+        pending = [k for k, s in states.items() if s == STALE]
+        while pending:
+            results = await prober.check_all(
+                client,
+                [entries[k]["url"] for k in pending],
+                [prober.headers_for(entries[k]) for k in pending],
+            )
+            retry = []
+            for k, res in zip(pending, results):
+                entry = entries[k]
+                if res["ok"]:
+                    states[k] = FRESH
+                    verified += 1
+                elif entry.get("alternates"):
+                    entry["url"] = entry["alternates"].pop(0)
+                    entry["expires"] = token_expiry(entry["url"])
+                    promoted += 1
+                    retry.append(k)
+                else:
+                    states[k] = RESOLVE
+            pending = retry
+        self.counts = {s: 0 for s in (FRESH, RESOLVE, WAIT)}
+        self.counts["verified"] = verified
+        self.counts["promoted"] = promoted
+        for s in states.values():
+            self.counts[s] += 1
+        keep = {k: v for k, v in entries.items() if states[k] != RESOLVE}
+        return keep, {k for k, s in states.items() if s == RESOLVE}
+
+    def summary(self) -> str:
+        c = self.counts
+        return (
+            f"Lifecycle: {c.get(FRESH, 0)} fresh ({c.get('verified', 0)} re-verified, "
+            f"{c.get('promoted', 0)} alternate(s) promoted), "
+            f"{c.get(RESOLVE, 0)} to re-resolve, {c.get(WAIT, 0)} failed and waiting to retry"
+        )
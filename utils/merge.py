@@ -0,0 +1,122 @@
+"""Merge per-source playlists into one deduplicated master playlist.
+
+Each source names an event `[sport] name (TAG)`, and the same match
+turns up in several sources under slightly different names ("Man Utd
+vs. Chelsea FC", "Chelsea v Manchester United"). `normalize_name` reduces
+a name to a canonical form:
+- case and punctuation are folded;
+- "vs"/"vs."/"v"/"@"/"versus" all become one separator;
+- club suffixes such as FC are dropped;
+- known team aliases are expanded;
+- the two sides are sorted, so home/away order doesn't matter.
+
+`merge_sources` groups entries on that form and orders each group's
+alternates by probe health (score, then time to first byte). Events are
+ordered by their best alternate. `write_master` emits every alternate
+with the healthiest one first, so a player that takes the first match
+gets the fastest working stream.
+"""
+import re
+from pathlib import Path
+
+from .playlist import PlaylistWriter
+from .predict import KEY_RE
+
+SEPARATOR_RE = re.compile(r"\s+(?:vs\.?|v\.?|versus|@|-)\s+", re.IGNORECASE)
+NON_WORD_RE = re.compile(r"[^\w\s]+")
+SPACE_RE = re.compile(r"\s+")
+
+DROP_WORDS = frozenset({"fc", "cf", "afc", "sc", "ac", "the", "live"})
+
+TEAM_ALIASES = {
+    "man utd": "manchester united",
+    "man united": "manchester united",
+    "man city": "manchester city",
+    "spurs": "tottenham hotspur",
+    "tottenham": "tottenham hotspur",
+    "wolves": "wolverhampton wanderers",
+    "newcastle": "newcastle united",
+    "west ham": "west ham united",
+    "psg": "paris saint germain",
+    "paris sg": "paris saint germain",
+    "inter": "inter milan",
+    "internazionale": "inter milan",
+    "barca": "barcelona",
+    "atletico": "atletico madrid",
+    "atl madrid": "atletico madrid",
+    "bayern": "bayern munich",
+    "bayern munchen": "bayern munich",
+    "dortmund": "borussia dortmund",
+    "bvb": "borussia dortmund",
+    "la lakers": "los angeles lakers",
+    "la clippers": "los angeles clippers",
+    "ny knicks": "new york knicks",
+}
+
+
+def _side(text: str) -> str:
+    text = NON_WORD_RE.sub(" ", text.lower())
+    words = [w for w in SPACE_RE.split(text) if w and w not in DROP_WORDS]
+    side = " ".join(words)
+    return TEAM_ALIASES.get(side, side)
+
+
+def normalize_name(name: str) -> str:
+    sides = SEPARATOR_RE.split(name.strip(), maxsplit=1)
+    return " vs ".join(sorted(_side(s) for s in sides))
+
+
+def split_key(key: str) -> tuple[str | None, str, str | None]:
+    if m := KEY_RE.match(key):
+        return m["sport"], m["event"], m["tag"]
+    return None, key, None
+
+
+def _health(result: dict | None) -> tuple[float, float]:
+    result = result or {}
+    ttfb = result.get("ttfb")
+    return (-(result.get("score") or 0), ttfb if ttfb is not None else float("inf"))
+
+
+def merge_sources(sources: dict[str, tuple[dict[str, dict], dict[str, dict]]]) -> list[dict]:
+    """`sources` maps a tag to (live entries by key, probe results by URL)."""
+    groups: dict[str, dict] = {}
+    for tag, (entries, probes) in sources.items():
+        for key, entry in entries.items():
+            if not (url := entry.get("url")):
+                continue
+            sport, name, key_tag = split_key(key)
+            group = groups.setdefault(
+                normalize_name(name),
+                {"sport": sport, "name": name, "logo": None, "id": None, "alternates": []},
+            )
+            group["logo"] = group["logo"] or entry.get("logo")
+            if entry.get("id") and group["id"] in (None, "Live.Event.us"):
+                group["id"] = entry["id"]
+            # backups captured with the primary rank by their own probe, if any
+            for alt in (url, *(entry.get("alternates") or ())):
+                group["alternates"].append(
+                    {"url": alt, "tag": key_tag or tag, "health": _health(probes.get(alt))}
+                )
+    for group in groups.values():
+        seen = set()
+        alternates = sorted(group["alternates"], key=lambda a: a["health"])
+        group["alternates"] = [a for a in alternates if not (a["url"] in seen or seen.add(a["url"]))]
+    return sorted(groups.values(), key=lambda g: g["alternates"][0]["health"])
+
+
+def write_master(path: str | Path, groups: list[dict]) -> int:
+    with PlaylistWriter(path) as playlist:
+        for group in groups:
+            for n, alt in enumerate(group["alternates"], start=1):
+                # index.html strips the trailing "(TAG)"; the "#n" keeps alternates apart
+                title = group["name"] if n == 1 else f"{group['name']} #{n}"
+                playlist.add(
+                    alt["url"],
+                    f"{title} ({alt['tag']})",
+                    tvg_id=group["id"],
+                    tvg_name=group["name"],
+                    tvg_logo=group["logo"],
+                    group_title=group["sport"],
+                )
+    return playlist.count
@@ -0,0 +1,136 @@
+"""Race mirrors instead of trying them one by one.
+
+`MirrorHealth` remembers how fast each mirror answered and when it last
+failed. `first_response` starts the historically fastest mirror first,
+staggers the rest in behind it, returns the first healthy response and
+cancels the others, so the winning probe doubles as the real download.
+
+The health file is committed between cron runs, so it is only rewritten
+when something worth keeping changed: a mirror starts or stops failing,
+or its latency moves by more than `DRIFT` (25%, at least one 50 ms
+step). Healthy mirrors carry no timestamp; only failures need one, to
+expire after `fail_ttl`.
+"""
+import asyncio
+import json
+import os
+import time
+
+import httpx
+
+HEALTH_FILE = "mirror-health.json"
+LATENCY_STEP = 0.05
+DRIFT = 0.25
+
+
+class MirrorHealth:
+    def __init__(self, filename: str = HEALTH_FILE, fail_ttl: float = 1_800):
+        self.filename = filename
+        self.fail_ttl = fail_ttl
+        self.data: dict[str, dict[str, float | bool]] = self._load()
+        self._saved = json.dumps(self.data, sort_keys=True)
+
+    def _load(self) -> dict:
+        try:
+            with open(self.filename, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def recently_failed(self, url: str, now: float) -> bool:
+        info = self.data.get(url) or {}
+        return not info.get("ok", True) and now - info.get("checked", 0) < self.fail_ttl
+
+    def order(self, mirrors: list[str]) -> list[str]:
+        now = time.time()
+        usable = [m for m in mirrors if not self.recently_failed(m, now)] or list(mirrors)
+        # known-good mirrors by latency, then never-measured ones in config order
+        return sorted(
+            usable,
+            key=lambda m: self.data.get(m, {}).get("latency") or float("inf"),
+        )
+
+    def record(self, url: str, latency: float | None) -> None:
+        old = self.data.get(url) or {}
+        if latency is None:
+            # keep the first failure time so `fail_ttl` runs from when it went down
+            if old.get("ok", True) or time.time() - old.get("checked", 0) >= self.fail_ttl:
+                self.data[url] = {"ok": False, "latency": None, "checked": round(time.time())}
+            return
+        latency = max(LATENCY_STEP, round(latency / LATENCY_STEP) * LATENCY_STEP)
+        if old.get("ok") and (prev := old.get("latency")) and abs(latency - prev) <= max(LATENCY_STEP, prev * DRIFT):
+            return
+        self.data[url] = {"ok": True, "latency": round(latency, 2)}
+
+    def save(self) -> None:
+        if (text := json.dumps(self.data, sort_keys=True)) == self._saved:
+            return
+        self._saved = text
+        tmp = f"{self.filename}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.filename)
+
+
+async def _probe(
+    client: httpx.AsyncClient,
+    url: str,
+    delay: float,
+    timeout: float,
+    headers: dict[str, str] | None,
+    accept: tuple[int, ...],
+) -> tuple[str, float, httpx.Response]:
+    await asyncio.sleep(delay)
+    started = time.perf_counter()
+    r = await client.get(url, headers=headers, timeout=timeout)
+    if r.status_code not in accept:
+        raise httpx.HTTPStatusError(f"Unexpected status {r.status_code}", request=r.request, response=r)
+    return url, time.perf_counter() - started, r
+
+
+async def first_response(
+    client: httpx.AsyncClient,
+    mirrors: list[str],
+    health: MirrorHealth | None = None,
+    timeout: float = 5,
+    stagger: float = 0.25,
+    headers: dict[str, str] | None = None,
+    accept: tuple[int, ...] = (200,),
+) -> tuple[str | None, httpx.Response | None]:
+    health = health or MirrorHealth()
+    ordered = health.order(mirrors)
+    tasks = {
+        asyncio.create_task(_probe(client, url, i * stagger, timeout, headers, accept)): url
+        for i, url in enumerate(ordered)
+    }
+    winner, response = None, None
+    try:
+        for fut in asyncio.as_completed(tasks):
+            try:
+                winner, _, response = await fut
+            except Exception:
+                continue
+            break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for task, url in tasks.items():
+            if not task.cancelled():
+                health.record(url, None if task.exception() else task.result()[1])
+        try:
+            health.save()
+        except Exception:
+            pass
+    return winner, response
+
+
+async def fastest_mirror(
+    client: httpx.AsyncClient,
+    mirrors: list[str],
+    health: MirrorHealth | None = None,
+    timeout: float = 5,
+    stagger: float = 0.25,
+) -> str | None:
+    url, _ = await first_response(client, mirrors, health, timeout, stagger)
+    return url
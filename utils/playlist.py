@@ -0,0 +1,75 @@
+"""Streaming, atomic M3U playlist writer.
+
+`PlaylistWriter` writes entries to `<path>.tmp` as they are added,
+flushing every `flush_every` entries. On a clean exit it fsyncs and
+swaps the file into place with `os.replace`, so anything serving or
+fetching the playlist sees either the previous complete file or the new
+one, never a half-written file. If the block raises, the old playlist
+is left alone and the partial `.tmp` is kept for inspection. With
+`keep_empty=False` a run that adds nothing also leaves the old file.
+
+Attribute values and titles are sanitised. M3U has no escape syntax, so
+double quotes become single quotes, and line breaks and control
+characters become spaces. Without this, one odd event name could break
+every entry after it.
+"""
+import os
+import re
+
+CONTROL_RE = re.compile(r"[\x00-\x1f\x7f]+")
+
+
+def clean_attr(value) -> str:
+    return CONTROL_RE.sub(" ", str(value)).replace('"', "'").strip()
+
+
+def clean_title(value) -> str:
+    return CONTROL_RE.sub(" ", str(value)).strip()
+
+
+def extinf(title: str, duration: int = -1, **attrs) -> str:
+    # attribute names use dashes (tvg-id); pass them as tvg_id=...
+    parts = [f"#EXTINF:{duration}"]
+    parts += [
+        f'{name.replace("_", "-")}="{clean_attr(value)}"'
+        for name, value in attrs.items()
+        if value not in (None, "")
+    ]
+    return f'{" ".join(parts)},{clean_title(title)}'
+
+
+class PlaylistWriter:
+    def __init__(self, path, flush_every: int = 20, keep_empty: bool = True):
+        self.path = os.fspath(path)
+        self.tmp = f"{self.path}.tmp"
+        self.flush_every = flush_every
+        self.keep_empty = keep_empty
+        self.count = 0
+        self._f = None
+
+    def __enter__(self):
+        self._f = open(self.tmp, "w", encoding="utf-8")
+        self._f.write("#EXTM3U\n")
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self._f.flush()
+        if exc_type is None:
+            os.fsync(self._f.fileno())
+        self._f.close()
+        if exc_type is not None:
+            return
+        if self.count or self.keep_empty:
+            os.replace(self.tmp, self.path)
+        else:
+            os.remove(self.tmp)
+
+    def write(self, info: str, url: str) -> None:
+        # `info` is a complete #EXTINF line, e.g. one copied from another playlist
+        self._f.write(f"{info}\n{CONTROL_RE.sub('', str(url or '')).strip()}\n")
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self._f.flush()
+
+    def add(self, url: str, title: str, duration: int = -1, **attrs) -> None:
+        self.write(extinf(title, duration, **attrs), url)
@@ -0,0 +1,114 @@
+"""Guess stream URLs from the ones we've already resolved.
+
+Resolved PPV playlists follow a handful of patterns, e.g.
+`https://gg.poocloud.in/<hometeam>/index.m3u8`. `URLPredictor` learns
+those patterns as templates from cached entries, fills them in for new
+events and keeps the first candidate that actually serves a playlist.
+"""
+import asyncio
+import re
+from collections import Counter
+from string import Formatter
+from urllib.parse import urlsplit
+
+import httpx
+
+from .validate import is_playlist
+
+TEAM_SPLIT = re.compile(r"\s+(?:vs\.?|v\.?|@|-)\s+", re.IGNORECASE)
+NON_ALNUM = re.compile(r"[^a-z0-9]+")
+KEY_RE = re.compile(r"^\[(?P<sport>.+?)\] (?P<event>.+) \((?P<tag>[^)]+)\)$")
+
+MIN_VALUE_LEN = 3
+
+
+def compact(text: str) -> str:
+    return NON_ALNUM.sub("", text.lower())
+
+
+def dashed(text: str) -> str:
+    return NON_ALNUM.sub("-", text.lower()).strip("-")
+
+
+def features(event: str, link: str | None = None) -> dict[str, str]:
+    feats = {}
+    teams = TEAM_SPLIT.split(event, maxsplit=1)
+    if len(teams) == 2:
+        for i, team in enumerate(teams):
+            feats[f"team{i}"] = compact(team)
+            feats[f"team{i}_dash"] = dashed(team)
+    feats["event"] = compact(event)
+    feats["event_dash"] = dashed(event)
+    if link:
+        parts = [p for p in urlsplit(link).path.split("/") if p]
+        if parts:
+            feats["slug"] = parts[-1]
+    return {k: v for k, v in feats.items() if len(v) >= MIN_VALUE_LEN}
+
+
+def template_for(url: str, feats: dict[str, str]) -> str | None:
+    # Only whole path segments are replaced so a short value can't match
+    # inside an unrelated host or token.
+    parts = urlsplit(url)
+    by_value = {v: k for k, v in feats.items()}
+    segments = parts.path.split("/")
+    hit = False
+    for i, seg in enumerate(segments):
+        if key := by_value.get(seg):
+            segments[i] = f"{{{key}}}"
+            hit = True
+    if not hit or parts.query:
+        return None
+    base = f"{parts.scheme}://{parts.netloc}".replace("{", "{{").replace("}", "}}")
+    return base + "/".join(segments)
+
+
+class URLPredictor:
+    def __init__(self, headers: dict[str, str] | None = None, max_candidates: int = 3):
+        self.templates: Counter[str] = Counter()
+        self.headers = headers or {}
+        self.max_candidates = max_candidates
+
+    def learn(self, event: str, link: str | None, url: str) -> None:
+        if tpl := template_for(url, features(event, link)):
+            self.templates[tpl] += 1
+
+    def learn_cache(self, entries: dict[str, dict]) -> "URLPredictor":
+        for key, entry in entries.items():
+            if not (url := entry.get("url")):
+                continue
+            event = entry.get("event")
+            if not event and (m := KEY_RE.match(key)):
+                event = m["event"]
+            if event:
+                self.learn(event, entry.get("link"), url)
+        return self
+
+    def candidates(self, event: str, link: str | None = None) -> list[str]:
+        feats = features(event, link)
+        out = []
+        for tpl, _ in self.templates.most_common():
+            fields = {f for _, f, _, _ in Formatter().parse(tpl) if f}
+            if not fields <= feats.keys():
+                continue
+            if (url := tpl.format_map(feats)) not in out:
+                out.append(url)
+            if len(out) >= self.max_candidates:
+                break
+        return out
+
+    async def check(self, client: httpx.AsyncClient, url: str, referer: str | None = None) -> bool:
+        headers = dict(self.headers)
+        if referer:
+            headers["Referer"] = referer
+        return await is_playlist(client, url, headers, timeout=5)
+
+    async def predict(self, client: httpx.AsyncClient, event: str, link: str | None = None) -> str | None:
+        if not (urls := self.candidates(event, link)):
+            return None
+        referer = None
+        if link:
+            parts = urlsplit(link)
+            referer = f"{parts.scheme}://{parts.netloc}/"
+        results = await asyncio.gather(*(self.check(client, url, referer) for url in urls))
+        return next((url for url, ok in zip(urls, results) if ok), None)
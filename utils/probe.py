@@ -0,0 +1,148 @@
+"""Deep HLS health checks.
+
+`probe_stream` fetches the playlist, follows one variant of a master
+playlist to its media playlist and checks that the newest segment is
+reachable, returning latency to first byte, segment age, bitrate and a
+0-100 score. `HLSProber` runs it over a source's entries with the same
+limits and short-lived cache as `PlaylistValidator`, drops dead streams
+and orders the rest best-first so stalled ones end up at the bottom.
+"""
+import re
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin
+
+import httpx
+
+from .validate import PlaylistValidator
+
+STREAM_INF_RE = re.compile(r"#EXT-X-STREAM-INF:([^\r\n]*)[\r\n]+\s*([^\s#][^\r\n]*)")
+BANDWIDTH_RE = re.compile(r"(?<![-A-Z])BANDWIDTH=(\d+)")
+TARGET_RE = re.compile(r"#EXT-X-TARGETDURATION:(\d+)")
+
+MAX_PLAYLIST_BYTES = 256 * 1_024
+STALL_AGE = 60
+
+
+async def _fetch_text(client: httpx.AsyncClient, url: str, headers, timeout: float) -> tuple[str, float, httpx.Response]:
+    started = time.perf_counter()
+    async with client.stream("GET", url, headers=headers, timeout=timeout, follow_redirects=True) as r:
+        ttfb = time.perf_counter() - started
+        r.raise_for_status()
+        body = b""
+        async for chunk in r.aiter_bytes():
+            body += chunk
+            if len(body) >= MAX_PLAYLIST_BYTES:
+                break
+    return body.decode("utf-8", "ignore"), ttfb, r
+
+
+def parse_master(text: str, base: str) -> list[tuple[int, str]]:
+    variants = []
+    for m in STREAM_INF_RE.finditer(text):
+        bw = BANDWIDTH_RE.search(m[1])
+        variants.append((int(bw[1]) if bw else 0, urljoin(base, m[2].strip())))
+    return sorted(variants)
+
+
+def parse_media(text: str, base: str) -> dict:
+    segments, clock, end_time, duration = [], None, None, 0.0
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#EXTINF:"):
+            try:
+                duration = float(line[8:].split(",", 1)[0])
+            except ValueError:
+                duration = 0.0
+        elif line.startswith("#EXT-X-PROGRAM-DATE-TIME:"):
+            try:
+                clock = datetime.fromisoformat(line[25:]).timestamp()
+            except ValueError:
+                clock = None
+        elif line and not line.startswith("#"):
+            segments.append(urljoin(base, line))
+            if clock is not None:
+                clock += duration
+                end_time = clock
+    target = TARGET_RE.search(text)
+    return {
+        "segments": segments,
+        "end_time": end_time,
+        "target": int(target[1]) if target else None,
+        "ended": "#EXT-X-ENDLIST" in text,
+    }
+
+
+async def _segment_reachable(client: httpx.AsyncClient, url: str, headers, timeout: float) -> tuple[bool, float | None]:
+    r = await client.head(url, headers=headers, timeout=timeout, follow_redirects=True)
+    if r.status_code in (403, 405, 501):
+        r = await client.get(
+            url, headers={**(headers or {}), "Range": "bytes=0-0"}, timeout=timeout, follow_redirects=True
+        )
+    modified = None
+    if lm := r.headers.get("last-modified"):
+        try:
+            modified = parsedate_to_datetime(lm).timestamp()
+        except (TypeError, ValueError):
+            pass
+    return r.status_code in (200, 206), modified
+
+
+def score(ttfb: float, age: float | None, bitrate: int, ended: bool) -> float:
+    value = 90 - min(40.0, ttfb * 20)
+    if age is not None:
+        value -= min(40.0, max(0.0, age - 10))
+    value += min(10.0, bitrate / 500_000)
+    if ended or (age is not None and age > STALL_AGE):
+        value = min(value, 5.0)
+    return round(min(max(value, 1.0), 100.0), 2)
+
+
+async def probe_stream(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: dict[str, str] | None = None,
+    timeout: float = 10,
+) -> dict:
+    try:
+        text, ttfb, r = await _fetch_text(client, url, headers, timeout)
+        if not text.lstrip("\ufeff \t\r\n").startswith("#EXTM3U"):
+            return {"ok": False, "error": "not a playlist"}
+        # relative URIs resolve against where the playlist ended up after redirects
+        bitrate, media_url = 0, str(r.url)
+        if variants := parse_master(text, media_url):
+            # the lowest variant is the cheapest to check; report the best one
+            media_url, bitrate = variants[0][1], variants[-1][0]
+            text, _, r = await _fetch_text(client, media_url, headers, timeout)
+            media_url = str(r.url)
+        media = parse_media(text, media_url)
+        if not media["segments"]:
+            return {"ok": False, "error": "no segments"}
+        reachable, modified = await _segment_reachable(client, media["segments"][-1], headers, timeout)
+        if not reachable:
+            return {"ok": False, "error": "segment unreachable"}
+    except httpx.HTTPStatusError as e:
+        return {"ok": False, "error": f"HTTP {e.response.status_code}"}
+    except Exception as e:
+        return {"ok": False, "error": str(e) or type(e).__name__}
+
+    now = datetime.now(timezone.utc).timestamp()
+    newest = media["end_time"] or modified
+    age = round(max(0.0, now - newest), 1) if newest else None
+    return {
+        "ok": True,
+        "ttfb": round(ttfb, 3),
+        "segment_age": age,
+        "bitrate": bitrate,
+        "ended": media["ended"],
+        "score": score(ttfb, age, bitrate, media["ended"]),
+    }
+
+
+class HLSProber(PlaylistValidator):
+    async def probe(self, client: httpx.AsyncClient, url: str, headers: dict[str, str] | None) -> dict:
+        return await probe_stream(client, url, headers, self.timeout)
+
+    def order(self, kept: list[tuple[str, dict, dict]]) -> list[tuple[str, dict, dict]]:
+        return sorted(kept, key=lambda item: -item[2].get("score", 0))
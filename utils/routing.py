@@ -0,0 +1,99 @@
+"""Request interception for headless scraping.
+
+`RouteFilter` aborts requests we never use (images, fonts, media, video
+segments, ads/analytics) while always letting playlist requests through.
+Attach it to a browser context so every page opened from it is covered.
+"""
+from collections import Counter
+from urllib.parse import urlsplit
+
+BLOCK_TYPES = frozenset({"image", "font", "media"})
+
+DENY_DOMAINS = frozenset(
+    {
+        "doubleclick.net",
+        "googlesyndication.com",
+        "googleadservices.com",
+        "google-analytics.com",
+        "googletagmanager.com",
+        "adservice.google.com",
+        "amazon-adsystem.com",
+        "scorecardresearch.com",
+        "histats.com",
+        "popads.net",
+        "popcash.net",
+        "propellerads.com",
+        "adsterra.com",
+        "exoclick.com",
+        "juicyads.com",
+        "hotjar.com",
+        "cloudflareinsights.com",
+    }
+)
+
+SEGMENT_SUFFIXES = (".ts", ".m4s", ".aac", ".m4a", ".mp4", ".vtt")
+
+ALLOW_MARKERS = (".m3u8",)
+
+
+class RouteFilter:
+    def __init__(
+        self,
+        block_types=BLOCK_TYPES,
+        deny_domains=DENY_DOMAINS,
+        segment_suffixes=SEGMENT_SUFFIXES,
+        allow_markers=ALLOW_MARKERS,
+    ):
+        self.block_types = frozenset(block_types)
+        self.deny_domains = frozenset(deny_domains)
+        self.segment_suffixes = tuple(segment_suffixes)
+        self.allow_markers = tuple(allow_markers)
+        self.allowed = 0
+        self.blocked: Counter[str] = Counter()
+
+    def _denied_host(self, host: str) -> bool:
+        parts = host.split(".")
+        return any(".".join(parts[i:]) in self.deny_domains for i in range(len(parts) - 1))
+
+    def reason(self, url: str, resource_type: str) -> str | None:
+        if any(m in url for m in self.allow_markers):
+            return None
+        parts = urlsplit(url)
+        if self._denied_host(parts.hostname or ""):
+            return "domain"
+        if resource_type in self.block_types:
+            return resource_type
+        if parts.path.lower().endswith(self.segment_suffixes):
+            return "segment"
+        return None
+
+    def _decide(self, request) -> str | None:
+        reason = self.reason(request.url, request.resource_type)
+        if reason:
+            self.blocked[reason] += 1
+        else:
+            self.allowed += 1
+        return reason
+
+    async def handle(self, route) -> None:
+        if self._decide(route.request):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def handle_sync(self, route) -> None:
+        if self._decide(route.request):
+            route.abort()
+        else:
+            route.continue_()
+
+    async def attach(self, context) -> None:
+        await context.route("**/*", self.handle)
+
+    def attach_sync(self, context) -> None:
+        context.route("**/*", self.handle_sync)
+
+    def summary(self) -> str:
+        total = sum(self.blocked.values())
+        detail = ", ".join(f"{k}: {v}" for k, v in self.blocked.most_common())
+        return f"Requests blocked: {total} ({detail or 'none'}), allowed: {self.allowed}"
@@ -0,0 +1,105 @@
+"""Order event resolution by urgency and stop when the run's budget is spent.
+
+`Scheduler.order` sorts events so that what is live now comes first
+(most watched first), then upcoming events by how soon they start, then
+events that have already finished. `Scheduler.run` wraps each unit of
+work and, with `limit`, admits at most that many at once. Once `budget`
+seconds have passed since the scheduler was created it returns
+`DEFERRED` instead of starting more work. Scrapers leave deferred events
+out of their cache, so the next cron tick picks them up again.
+
+The budget is checked when a unit gets its slot, not when it is queued,
+and asyncio's semaphores wake waiters first-come first-served. So a
+gather over the ordered events starts them in priority order, and a cut
+only drops the least urgent ones.
+
+Fields are taken as APIs send them: PPV reports `viewers` as a string
+("1234"), so numbers are coerced here, and anything unparseable counts
+as zero viewers or no end time.
+"""
+import asyncio
+import math
+import time
+from collections.abc import Awaitable, Callable
+from contextlib import nullcontext
+from typing import Any
+
+DEFERRED = object()
+
+# without an `ends_at`, assume an event is still on for this long after it starts
+LIVE_FOR = 10_800
+
+
+def _number(value) -> float | None:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def priority(
+    start: float | None,
+    end: float | None = None,
+    viewers: int | str | None = None,
+    now: float | None = None,
+) -> tuple:
+    now = time.time() if now is None else now
+    start, end = _number(start), _number(end)
+    viewers = int(_number(viewers) or 0)
+    if start is None:
+        return (3, 0, 0)
+    if start <= now:
+        if now <= (end if end is not None else start + LIVE_FOR):
+            return (0, -viewers, now - start)
+        return (2, now - start, -viewers)
+    return (1, start - now, -viewers)
+
+
+class Scheduler:
+    def __init__(
+        self,
+        budget: float | None = None,
+        limit: int | None = None,
+        start: str = "timestamp",
+        end: str = "ends_at",
+        viewers: str = "viewers",
+    ):
+        self.budget = budget
+        self.keys = (start, end, viewers)
+        self._sem = asyncio.Semaphore(limit) if limit else None
+        self.started = time.monotonic()
+        self.ran = 0
+        self.deferred = 0
+
+    def remaining(self) -> float | None:
+        if self.budget is None:
+            return None
+        return max(0.0, self.budget - (time.monotonic() - self.started))
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() == 0
+
+    def order(self, events: list[dict], now: float | None = None) -> list[dict]:
+        now = time.time() if now is None else now
+        start, end, viewers = self.keys
+        return sorted(
+            events,
+            key=lambda ev: priority(ev.get(start), ev.get(end), ev.get(viewers), now),
+        )
+
+    async def run(self, handler: Callable[[], Awaitable[Any]]) -> Any:
+        async with self._sem or nullcontext():
+            if self.expired:
+                self.deferred += 1
+                return DEFERRED
+            self.ran += 1
+            return await handler()
+
+    def summary(self) -> str:
+        spent = time.monotonic() - self.started
+        return (
+            f"Scheduler: {self.ran} started, {self.deferred} deferred to next run "
+            f"({spent:.1f}s of {self.budget or 'unlimited'}s budget)"
+        )
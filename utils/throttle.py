@@ -0,0 +1,69 @@
+"""Concurrency caps, per-host pacing and retries for outgoing requests."""
+import asyncio
+import random
+from contextlib import asynccontextmanager, nullcontext
+from urllib.parse import urlsplit
+
+import httpx
+
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class HostLimiter:
+    def __init__(self, limit: int = 16, per_host: int = 4, min_interval: float = 0):
+        self.per_host = per_host
+        self.min_interval = min_interval
+        self._all = asyncio.Semaphore(limit)
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._next: dict[str, float] = {}
+
+    async def _pace(self, host: str) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._locks.setdefault(host, asyncio.Lock()):
+            if (wait := self._next.get(host, 0) - loop.time()) > 0:
+                await asyncio.sleep(wait)
+            self._next[host] = loop.time() + self.min_interval
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        host = urlsplit(url).netloc
+        sem = self._hosts.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with sem, self._all:
+            if self.min_interval:
+                await self._pace(host)
+            yield
+
+
+def _retry_after(r: httpx.Response) -> float | None:
+    try:
+        return float(r.headers.get("retry-after", ""))
+    except ValueError:
+        return None
+
+
+async def get_with_retry(
+    client: httpx.AsyncClient,
+    url: str,
+    limiter: HostLimiter | None = None,
+    attempts: int = 3,
+    backoff: float = 0.5,
+    **kwargs,
+) -> httpx.Response:
+    # Retries transport errors and 429/5xx with exponential backoff (or the
+    # server's Retry-After); anything else is returned or raised at once.
+    for attempt in range(1, attempts + 1):
+        delay = backoff * 2 ** (attempt - 1) * (1 + random.random() / 2)
+        try:
+            async with limiter.slot(url) if limiter else nullcontext():
+                r = await client.get(url, **kwargs)
+        except httpx.TransportError:
+            if attempt == attempts:
+                raise
+        else:
+            if r.status_code not in RETRY_STATUS or attempt == attempts:
+                r.raise_for_status()
+                return r
+            delay = _retry_after(r) or delay
+        await asyncio.sleep(delay)
+    raise RuntimeError("unreachable")
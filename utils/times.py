@@ -0,0 +1,95 @@
+"""Timezone-aware time helpers shared by the scrapers.
+
+`Time` is a `datetime` that is always aware (UTC unless a zone is
+given). Upstream sites hand us times in three shapes: epoch seconds
+(ppv), epoch milliseconds (watchfooty's `ts`) and local wall-clock
+strings (roxie's `data-start`, in US Pacific time). `Time.from_ts` and
+`Time.from_str` cover single values. `to_epochs` and `parse_epochs`
+convert whole lists straight to epoch floats, so windowing loops compare
+plain numbers instead of building a datetime per event.
+"""
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# anything larger is taken to be milliseconds (1e11 s is the year 5138)
+MS_THRESHOLD = 1e11
+
+FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%m/%d/%Y %H:%M", "%b %d, %Y %H:%M")
+
+
+def _zone(name: str, fallback_hours: int):
+    try:
+        return ZoneInfo(name)
+    except ZoneInfoNotFoundError:
+        return timezone(timedelta(hours=fallback_hours), name)
+
+
+ZONES = {
+    "UTC": timezone.utc,
+    "PST": _zone("America/Los_Angeles", -8),
+    "EST": _zone("America/New_York", -5),
+}
+
+
+def to_seconds(value) -> float | None:
+    try:
+        ts = float(value)
+    except (TypeError, ValueError):
+        return None
+    return ts / 1_000 if abs(ts) >= MS_THRESHOLD else ts
+
+
+def to_epochs(values) -> list[float | None]:
+    return [to_seconds(v) for v in values]
+
+
+def parse_epochs(values, timezone: str = "UTC", fmt: str | None = None) -> list[float | None]:
+    # pages repeat the same start times a lot; parse each distinct string once
+    seen: dict[str, float | None] = {}
+    out = []
+    for value in values:
+        if value not in seen:
+            dt = Time.from_str(value, timezone, fmt)
+            seen[value] = dt.timestamp() if dt else None
+        out.append(seen[value])
+    return out
+
+
+class Time(datetime):
+    @classmethod
+    def now(cls, tz=None) -> "Time":
+        return super().now(tz or timezone.utc)
+
+    @classmethod
+    def clean(cls, dt: datetime) -> "Time":
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return cls.from_ts(int(dt.timestamp()))
+
+    @classmethod
+    def from_ts(cls, ts, tz=None) -> "Time | None":
+        if (seconds := to_seconds(ts)) is None:
+            return None
+        return cls.fromtimestamp(seconds, tz or timezone.utc)
+
+    @classmethod
+    def from_str(cls, value: str, timezone: str = "UTC", fmt: str | None = None) -> "Time | None":
+        tz = ZONES.get(timezone.upper()) or ZoneInfo(timezone)
+        value = (value or "").strip()
+        for f in (fmt,) if fmt else FORMATS:
+            try:
+                dt = datetime.strptime(value, f)
+                break
+            except ValueError:
+                continue
+        else:
+            try:
+                dt = datetime.fromisoformat(value)
+            except ValueError:
+                return None
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=tz)
+        return cls.from_ts(dt.timestamp())
+
+    def delta(self, **kwargs) -> "Time":
+        return self + timedelta(**kwargs)
@@ -0,0 +1,114 @@
+"""Cheap liveness checks for playlist URLs.
+
+`is_playlist` streams just enough of the response to see the `#EXTM3U`
+header instead of downloading the whole body. `PlaylistValidator` runs
+those checks concurrently under a global and a per-host cap, remembers
+results for a short TTL and hands entries back in their original order.
+"""
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from .caching import Cache
+from .throttle import HostLimiter
+
+HEADER = b"#EXTM3U"
+LEADING = b"\xef\xbb\xbf \t\r\n"
+
+
+async def is_playlist(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: dict[str, str] | None = None,
+    timeout: float = 10,
+    max_bytes: int = 1_024,
+) -> bool:
+    try:
+        async with client.stream("GET", url, headers=headers, timeout=timeout, follow_redirects=True) as r:
+            if r.status_code != 200:
+                return False
+            head = b""
+            async for chunk in r.aiter_bytes():
+                head += chunk
+                if len(head.lstrip(LEADING)) >= len(HEADER) or len(head) >= max_bytes:
+                    break
+            return head.lstrip(LEADING).startswith(HEADER)
+    except Exception:
+        return False
+
+
+class PlaylistValidator:
+    def __init__(
+        self,
+        headers: dict[str, str] | None = None,
+        limit: int = 16,
+        per_host: int = 4,
+        cache: Cache | None = None,
+        timeout: float = 10,
+    ):
+        self.headers = headers
+        self.limit = limit
+        self.per_host = per_host
+        self.cache = cache
+        self.timeout = timeout
+        self.checked = 0
+        self.cache_hits = 0
+        # latest result per URL, for callers that rank across sources
+        self.results: dict[str, dict] = {}
+
+    def headers_for(self, entry: dict) -> dict[str, str] | None:
+        # Most hosts want the embedding site as Referer; entries carry it as
+        # `link` (the embed page) or `base` (the site mirror).
+        if not (origin := entry.get("link") or entry.get("base")):
+            return self.headers
+        parts = urlsplit(origin)
+        return {**(self.headers or {}), "Referer": f"{parts.scheme}://{parts.netloc}/"}
+
+    async def probe(self, client: httpx.AsyncClient, url: str, headers: dict[str, str] | None) -> dict:
+        return {"ok": await is_playlist(client, url, headers, self.timeout)}
+
+    async def _check(self, client, limiter: HostLimiter, known: dict, url: str, headers) -> dict:
+        if (hit := known.get(url)) is not None:
+            self.cache_hits += 1
+            return hit
+        async with limiter.slot(url):
+            result = await self.probe(client, url, headers)
+        self.checked += 1
+        known[url] = {**result, "timestamp": time.time()}
+        return known[url]
+
+    async def check_all(
+        self,
+        client: httpx.AsyncClient,
+        urls: list[str],
+        headers: list[dict[str, str] | None] | None = None,
+    ) -> list[dict]:
+        known = self.cache.load() if self.cache else {}
+        limiter = HostLimiter(self.limit, self.per_host)
+        headers = headers or [self.headers] * len(urls)
+        results = await asyncio.gather(
+            *(self._check(client, limiter, known, u, h) for u, h in zip(urls, headers))
+        )
+        if self.cache:
+            self.cache.write(known)
+        self.results.update(zip(urls, results))
+        return list(results)
+
+    async def filter_live(
+        self,
+        client: httpx.AsyncClient,
+        entries: dict[str, dict],
+    ) -> dict[str, dict]:
+        items = [(k, v) for k, v in entries.items() if v.get("url")]
+        results = await self.check_all(
+            client,
+            [v["url"] for _, v in items],
+            [self.headers_for(v) for _, v in items],
+        )
+        kept = [(k, v, res) for (k, v), res in zip(items, results) if res["ok"]]
+        return {k: v for k, v, _ in self.order(kept)}
+
+    def order(self, kept: list[tuple[str, dict, dict]]) -> list[tuple[str, dict, dict]]:
+        return kept
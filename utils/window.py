@@ -0,0 +1,84 @@
+"""Events sorted by start time, for window and live-now queries.
+
+`EventIndex` sorts items once by their start timestamp (epoch seconds)
+and answers `between(a, b)` with two bisections. `live(now)` bisects to
+the events that started within the longest known duration before `now`
+and keeps those whose end is still ahead, so neither query looks at the
+whole list.
+
+`EventIndex.for_streams` builds the index over a PPV API payload and
+keeps it for as long as the file on disk is unchanged.
+"""
+import os
+import time
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from .apistream import SKIP_CATEGORIES, iter_streams
+
+_STREAM_INDEXES: dict[tuple, "EventIndex"] = {}
+
+
+def _stream_start(pair: tuple[str | None, dict]) -> float | None:
+    return pair[1].get("starts_at")
+
+
+def _stream_end(pair: tuple[str | None, dict]) -> float | None:
+    return pair[1].get("ends_at")
+
+
+class EventIndex:
+    def __init__(
+        self,
+        items: Iterable[Any],
+        start: Callable[[Any], float | None],
+        end: Callable[[Any], float | None] | None = None,
+    ):
+        rows = []
+        for item in items:
+            ts = start(item)
+            if isinstance(ts, (int, float)):
+                stop = end(item) if end else None
+                rows.append((ts, stop if isinstance(stop, (int, float)) else None, item))
+        rows.sort(key=lambda row: row[0])
+        self.starts = [ts for ts, _, _ in rows]
+        self.ends = [stop for _, stop, _ in rows]
+        self.items = [item for _, _, item in rows]
+        self.max_span = max(
+            (stop - ts for ts, stop, _ in rows if stop is not None and stop > ts),
+            default=0,
+        )
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def between(self, start: float, end: float) -> list:
+        lo = bisect_left(self.starts, start)
+        hi = bisect_right(self.starts, end)
+        return self.items[lo:hi]
+
+    def live(self, now: float | None = None) -> list:
+        now = time.time() if now is None else now
+        lo = bisect_left(self.starts, now - self.max_span)
+        hi = bisect_right(self.starts, now)
+        return [
+            self.items[i]
+            for i in range(lo, hi)
+            if self.ends[i] is not None and self.ends[i] >= now
+        ]
+
+    @classmethod
+    def for_streams(cls, path, skip_categories=SKIP_CATEGORIES) -> "EventIndex":
+        st = os.stat(path)
+        key = (os.fspath(path), st.st_mtime_ns, st.st_size, tuple(sorted(skip_categories)))
+        if (index := _STREAM_INDEXES.get(key)) is None:
+            # one index per payload; a new download changes mtime/size and rebuilds it
+            for stale in [k for k in _STREAM_INDEXES if k[0] == key[0] and k[1:3] != key[1:3]]:
+                del _STREAM_INDEXES[stale]
+            index = _STREAM_INDEXES[key] = cls(
+                iter_streams(path, skip_categories=skip_categories),
+                _stream_start,
+                _stream_end,
+            )
+        return index
@@ -1,39 +1,33 @@
 import asyncio
+import json
 import re
+import time
+from collections import Counter
 from functools import partial
 from itertools import chain
 from typing import Any
 from urllib.parse import urljoin
 
 import httpx
-from playwright.async_api import async_playwright
+
+from utils import (
+    DEFERRED,
+    Cache,
+    EventIndex,
+    HLSProber,
+    Lifecycle,
+    M3U8Capture,
+    PlaylistWriter,
+    RouteFilter,
+    Scheduler,
+    Time,
+    browser_context,
+    extract_m3u8,
+    is_playlist,
+    to_epochs,
+)
 
 # Placeholder utils (replace with your real utils if available)
-class Cache:
-    def __init__(self, filename, exp):
-        self.filename = filename
-        self.exp = exp
-    def load(self, *a, **k):
-        return {}
-    def write(self, data):
-        pass
-class Time:
-    @staticmethod
-    def now():
-        import datetime
-        return datetime.datetime.now()
-    @staticmethod
-    def clean(dt):
-        return dt
-    @staticmethod
-    def from_ts(ts):
-        import datetime
-        return datetime.datetime.fromtimestamp(ts)
-    def delta(self, **kwargs):
-        import datetime
-        return self + datetime.timedelta(**kwargs)
-    def timestamp(self):
-        return self.timestamp()
 class Logger:
     def info(self, msg): print(msg)
     def warning(self, msg): print(msg)
@@ -48,25 +42,17 @@ class Network:
     async def get_base(mirrors): return mirrors[0]
     @staticmethod
     async def safe_process(handler, url_num, log): return await handler()
-    @staticmethod
-    async def browser(p):
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context()
-        return browser, context
-    @staticmethod
-    def capture_req(request, captured, got_one):
-        url = request.url
-        if ".m3u8" in url:
-            captured.append(url)
-            got_one.set()
 network = Network()
 
 log = get_logger(__name__)
 
 urls: dict[str, dict[str, str | float]] = {}
 
-CACHE_FILE = Cache("watchfty.json", exp=None)
+CACHE_FILE = Cache("watchfty.json", exp=10_800)
 API_FILE = Cache("watchfty-api.json", exp=None)
+# JSON endpoints the match player was seen reading stream URLs from, keyed
+# by URL template with the match id replaced by `{match_id}`
+ENDPOINTS_FILE = Cache("watchfty-endpoints.json", exp=None)
 API_MIRRORS = ["https://api.watchfooty.st"]
 BASE_MIRRORS = ["https://www.watchfooty.top", "https://www.watchfooty.st"]
 SPORT_ENDPOINTS = [
@@ -76,6 +62,21 @@ SPORT_ENDPOINTS = [
 
 ]
 TAG = "WFTY"
+# a browser UA for playlist checks; the Referer is added per entry
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+}
+PROBER = HLSProber(headers=HEADERS, cache=Cache("watchfty-live.json", exp=300))
+# failed resolutions are cached as `url: None` and retried after `retry_after`
+LIFECYCLE = Lifecycle()
+CAPTURE_TIMEOUT = 20
+# stream links resolved per match, and pages open for them at once
+MAX_LINKS = 6
+LINK_PAGES = 3
+# matches that kicked off up to 3 h ago are still on; look 30 min ahead
+WINDOW_BEFORE = 10_800
+WINDOW_AFTER = 1_800
+RUN_BUDGET = 600
 
 async def get_api_data(client: httpx.AsyncClient, url: str) -> list[dict[str, Any]]:
     try:
@@ -91,77 +92,147 @@ async def refresh_api_cache(client: httpx.AsyncClient, url: str) -> list[dict[st
     tasks = [get_api_data(client, urljoin(url, f"api/v1/matches/{sport}")) for sport in SPORT_ENDPOINTS]
     results = await asyncio.gather(*tasks)
     data = list(chain(*results))
-    for ev in data:
-        ev["ts"] = ev.pop("timestamp", 0)
-        ev["timestamp"] = Time.now().timestamp()
+    now_ts = Time.now().timestamp()
+    # upstream `timestamp` is the kick-off in epoch ms; keep it as seconds in `ts`
+    for ev, ts in zip(data, to_epochs(ev.pop("timestamp", None) for ev in data)):
+        ev["ts"] = ts
+        ev["timestamp"] = now_ts
     return data
 
-async def process_event(url: str, url_num: int, context) -> str | None:
-    page = await context.new_page()
-    captured = []
-    got_one = asyncio.Event()
-    handler = partial(network.capture_req, captured=captured, got_one=got_one)
-    page.on("request", handler)
-    try:
-        await page.goto(url, wait_until="domcontentloaded", timeout=15_000)
-        await page.wait_for_timeout(1_500)
+def watch_endpoints(page, match_id: str, learned: dict[str, dict]) -> None:
+    # The stream-source endpoint isn't documented, so it is learned from the
+    # player's own traffic: any JSON response whose URL names this match and
+    # whose body carries a playlist URL becomes a template for later runs.
+    id_re = re.compile(rf"(?<![\w-]){re.escape(match_id)}(?![\w-])")
+
+    async def on_response(response):
+        if not id_re.search(response.url) or "json" not in response.headers.get("content-type", ""):
+            return
         try:
-            header = await page.wait_for_selector("text=/Stream Links/i", timeout=5_000)
-            text = await header.inner_text()
+            text = await response.text()
         except Exception:
-            log.warning(f"URL {url_num}) Can't find stream links header.")
-            return
-        match = re.search(r"\((\d+)\)", text)
-        if not match or int(match[1]) == 0:
-            log.warning(f"URL {url_num}) No available stream links.")
             return
-        first_available = await page.wait_for_selector('a[href*="/stream/"]', timeout=3_000)
-        await first_available.click()
-        wait_task = asyncio.create_task(got_one.wait())
+        if extract_m3u8(text):
+            template = id_re.sub("{match_id}", response.url)
+            learned.setdefault(template, {"timestamp": time.time()})
+
+    page.on("response", on_response)
+
+async def resolve_direct(
+    client: httpx.AsyncClient,
+    base_url: str,
+    candidates: list[str],
+    match_id: str,
+    endpoints: list[str],
+    hits: Counter,
+) -> list[str]:
+    headers = {**HEADERS, "Referer": base_url if base_url.endswith("/") else f"{base_url}/"}
+    candidates = list(candidates)
+    for template in endpoints:
         try:
-            await asyncio.wait_for(wait_task, timeout=6)
-        except asyncio.TimeoutError:
-            log.warning(f"URL {url_num}) Timed out waiting for M3U8.")
-            return
+            r = await client.get(
+                template.replace("{match_id}", match_id), headers=headers, timeout=5, follow_redirects=True
+            )
+            r.raise_for_status()
+        except Exception:
+            continue
+        hits[template] += 1
+        candidates += extract_m3u8(r.text)
+    # only URLs that really serve a playlist count, so a dead one still goes to the browser
+    if not (candidates := list(dict.fromkeys(candidates))[:MAX_LINKS]):
+        return []
+    checks = await asyncio.gather(*(is_playlist(client, url, headers) for url in candidates))
+    return [url for url, ok in zip(candidates, checks) if ok]
+
+async def collect_links(page, url: str, url_num: int) -> list[str]:
+    await page.goto(url, wait_until="domcontentloaded", timeout=15_000)
+    try:
+        header = await page.wait_for_selector("text=/Stream Links/i", timeout=5_000)
+        text = await header.inner_text()
+    except Exception:
+        log.warning(f"URL {url_num}) Can't find stream links header.")
+        return []
+    match = re.search(r"\((\d+)\)", text)
+    if not match or int(match[1]) == 0:
+        log.warning(f"URL {url_num}) No available stream links.")
+        return []
+    await page.wait_for_selector('a[href*="/stream/"]', timeout=3_000)
+    hrefs = await page.eval_on_selector_all('a[href*="/stream/"]', "els => els.map(e => e.href)")
+    # the match page itself also lives under /stream/
+    links = [h for h in dict.fromkeys(hrefs) if h and h not in (url, page.url)]
+    return links[:MAX_LINKS]
+
+async def resolve_link(
+    context,
+    href: str,
+    pages: asyncio.Semaphore,
+    timeout: float,
+    watch=None,
+) -> tuple[float, str] | None:
+    async with pages:
+        page = await context.new_page()
+        if watch:
+            watch(page)
+        started = time.perf_counter()
+        try:
+            with M3U8Capture(page) as capture:
+                async with asyncio.timeout(timeout):
+                    await capture.wait_during(page.goto(href, wait_until="commit", timeout=timeout * 1_000))
+            return time.perf_counter() - started, capture.first
+        except Exception:
+            return None
         finally:
-            if not wait_task.done():
-                wait_task.cancel()
-                try:
-                    await wait_task
-                except asyncio.CancelledError:
-                    pass
-        if captured:
-            log.info(f"URL {url_num}) Captured M3U8")
-            return captured[-1]
-        log.warning(f"URL {url_num}) No M3U8 captured after waiting.")
-        return
+            await page.close()
+
+async def process_event(
+    url: str,
+    url_num: int,
+    context,
+    timeout: float = CAPTURE_TIMEOUT,
+    watch=None,
+) -> list[str]:
+    # one load of the match page for every stream link, then each link in its own page
+    page = await context.new_page()
+    if watch:
+        watch(page)
+    try:
+        async with asyncio.timeout(timeout):
+            links = await collect_links(page, url, url_num)
+    except TimeoutError:
+        log.warning(f"URL {url_num}) Timed out waiting for stream links.")
+        return []
     except Exception as e:
         log.warning(f"URL {url_num}) Exception while processing: {e}")
-        return
+        return []
     finally:
-        page.remove_listener("request", handler)
         await page.close()
+    if not links:
+        return []
+    pages = asyncio.Semaphore(LINK_PAGES)
+    results = await asyncio.gather(*(resolve_link(context, href, pages, timeout, watch) for href in links))
+    # fastest capture first; it is the best guess at the healthiest mirror
+    ranked = list(dict.fromkeys(m3u8 for _, m3u8 in sorted(r for r in results if r and r[1])))
+    if ranked:
+        log.info(f"URL {url_num}) Captured {len(ranked)} M3U8(s) from {len(links)} stream link(s)")
+    else:
+        log.warning(f"URL {url_num}) No M3U8 from {len(links)} stream link(s).")
+    return ranked
 
 async def get_events(client: httpx.AsyncClient, api_url: str, base_url: str, cached_keys: set[str]) -> list[dict[str, str]]:
     api_data = await refresh_api_cache(client, api_url)
     events = []
-    import datetime
-    now = datetime.datetime.now()
-    start_dt = now
-    end_dt = now
+    now = Time.clean(Time.now())
+    start_ts = now.delta(seconds=-WINDOW_BEFORE).timestamp()
+    end_ts = now.delta(seconds=WINDOW_AFTER).timestamp()
     pattern = re.compile(r"\-+|\(")
-    for event in api_data:
+    index = EventIndex(api_data, lambda ev: ev.get("ts"))
+    for event in index.between(start_ts, end_ts):
         match_id = event.get("matchId")
         name = event.get("title")
         league = event.get("league")
         if not (match_id and name and league):
             continue
-        if not (ts := event.get("ts")):
-            continue
-        start_ts = float(f"{ts}"[:-3])
-        event_dt = Time.from_ts(start_ts)
-        if not (start_dt <= event_dt <= end_dt):
-            continue
+        event_dt = Time.from_ts(event["ts"])
         sport = pattern.split(league, 1)[0].strip()
         logo = urljoin(api_url, event.get("poster")) if event.get("poster") else None
         key = f"[{sport}] {name} ({TAG})"
@@ -170,14 +241,24 @@ async def get_events(client: httpx.AsyncClient, api_url: str, base_url: str, cac
         events.append({
             "sport": sport,
             "event": name,
+            "match_id": str(match_id),
             "link": urljoin(base_url, f"stream/{match_id}"),
+            # stream sources the matches listing already exposes, if any
+            "candidates": extract_m3u8(json.dumps(event))[:MAX_LINKS],
             "logo": logo,
             "timestamp": event_dt.timestamp(),
         })
     return events
 
-async def scrape(client: httpx.AsyncClient) -> None:
-    cached_urls = CACHE_FILE.load()
+async def scrape(
+    client: httpx.AsyncClient,
+    browser=None,
+    budget: float | None = RUN_BUDGET,
+) -> dict[str, dict]:
+    scheduler = Scheduler(budget)
+    known = CACHE_FILE.load()
+    cached_urls, _ = await LIFECYCLE.triage(client, PROBER, known)
+    log.info(LIFECYCLE.summary())
     valid_urls = {k: v for k, v in cached_urls.items() if v.get("url")}
     valid_count = cached_count = len(valid_urls)
     urls.update(valid_urls)
@@ -187,55 +268,94 @@ async def scrape(client: httpx.AsyncClient) -> None:
     if not (base_url and api_url):
         log.warning("No working Watch Footy mirrors")
         CACHE_FILE.write(cached_urls)
-        return
+        return {}
     log.info(f'Scraping from "{base_url}"')
-    events = await get_events(client, api_url, base_url, set(cached_urls.keys()))
+    events = scheduler.order(
+        await get_events(client, api_url, base_url, set(cached_urls.keys()))
+    )
     log.info(f"Processing {len(events)} new URL(s)")
+
+    def record(ev: dict, found: list[str] | None) -> None:
+        nonlocal valid_count
+        url, *alternates = found or [None]
+        sport, event, logo, ts, link = (
+            ev["sport"], ev["event"], ev["logo"], ev["timestamp"], ev["link"]
+        )
+        key = f"[{sport}] {event} ({TAG})"
+        tvg_id, pic = leagues.get_tvg_info(sport, event)
+        entry = {
+            "url": url,
+            "logo": logo or pic,
+            "base": base_url,
+            "timestamp": ts,
+            "id": tvg_id or "Live.Event.us",
+            "link": link,
+            "alternates": alternates,
+        }
+        cached_urls[key] = LIFECYCLE.stamp(entry)
+        if url:
+            valid_count += 1
+            urls[key] = entry
+
+    # Plain httpx first: URLs already in the match listing, then any stream
+    # endpoint learned from an earlier browser run. Only the rest pay for a page.
+    learned = ENDPOINTS_FILE.load()
+    endpoints, hits = list(learned), Counter()
+    direct = await asyncio.gather(
+        *(
+            resolve_direct(client, base_url, ev["candidates"], ev["match_id"], endpoints, hits)
+            for ev in events
+        )
+    )
+    remaining = []
+    for ev, found in zip(events, direct):
+        if found:
+            record(ev, found)
+        else:
+            remaining.append(ev)
     if events:
-        async with async_playwright() as p:
-            browser, context = await network.browser(p)
-            for i, ev in enumerate(events, start=1):
-                handler = partial(process_event, url=ev["link"], url_num=i, context=context)
-                url = await network.safe_process(handler, url_num=i, log=log)
-                sport, event, logo, ts, link = (
-                    ev["sport"], ev["event"], ev["logo"], ev["timestamp"], ev["link"]
-                )
-                key = f"[{sport}] {event} ({TAG})"
-                tvg_id, pic = leagues.get_tvg_info(sport, event)
-                entry = {
-                    "url": url,
-                    "logo": logo or pic,
-                    "base": base_url,
-                    "timestamp": ts,
-                    "id": tvg_id or "Live.Event.us",
-                    "link": link,
-                }
-                cached_urls[key] = entry
-                if url:
-                    valid_count += 1
-                    urls[key] = entry
-            await browser.close()
+        # an endpoint that answered for none of this run's matches is dropped and relearned
+        for template in endpoints:
+            if not hits[template]:
+                log.warning(f'Stream endpoint "{template}" stopped answering; forgetting it')
+                del learned[template]
+        log.info(
+            f"{len(events) - len(remaining)}/{len(events)} match(es) "
+            f"({(len(events) - len(remaining)) / len(events):.0%}) resolved without the browser "
+            + (f"via {len(endpoints)} learned stream endpoint(s)" if endpoints else "(no stream endpoint learned yet)")
+        )
+    if remaining:
+        async with browser_context(browser) as context:
+            routes = RouteFilter()
+            await routes.attach(context)
+            for i, ev in enumerate(remaining, start=1):
+                watch = partial(watch_endpoints, match_id=ev["match_id"], learned=learned)
+                handler = partial(process_event, url=ev["link"], url_num=i, context=context, watch=watch)
+                found = await scheduler.run(partial(network.safe_process, handler, url_num=i, log=log))
+                if found is DEFERRED:
+                    continue
+                record(ev, found)
+        log.info(routes.summary())
+        log.info(scheduler.summary())
+    if learned.keys() != set(endpoints):
+        log.info(f"Stream endpoints known: {', '.join(learned) or 'none'}")
+    ENDPOINTS_FILE.write(learned)
     if new_count := valid_count - cached_count:
         log.info(f"Collected and cached {new_count} new event(s)")
     else:
         log.info("No new events found")
     CACHE_FILE.write(cached_urls)
     # Export only working links to M3U playlist
-    m3u_lines = ['#EXTM3U']
-    for key, entry in cached_urls.items():
-        url = entry["url"]
-        if not url:
-            continue
-        m3u_lines.append(f'#EXTINF:-1 tvg-id="{entry.get("id", "")}" tvg-logo="{entry.get("logo", "")}",{key}')
-        m3u_lines.append(url)
-    with open("watchfty.m3u", "w", encoding="utf-8") as f:
-        f.write("\n".join(m3u_lines))
+    live = await PROBER.filter_live(client, cached_urls)
+    log.info(
+        f"Probed {len(cached_urls)} playlist(s): {len(live)} live, "
+        f"{PROBER.checked} checked, {PROBER.cache_hits} from cache"
+    )
+    with PlaylistWriter("watchfty.m3u") as playlist:
+        for key, entry in live.items():
+            playlist.add(entry["url"], key, tvg_id=entry.get("id"), tvg_name=key, tvg_logo=entry.get("logo"))
     log.info("Exported working events to watchfty.m3u")
-
-    # Also export all event data to watchfty.json for API/debugging
-    import json
-    with open("watchfty.json", "w", encoding="utf-8") as jf:
-        json.dump(urls, jf, ensure_ascii=False, indent=2)
+    return live
 
 if __name__ == "__main__":
     async def main():